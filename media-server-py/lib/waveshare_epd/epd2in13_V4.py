@@ -37,6 +37,11 @@ EPD_HEIGHT      = 250
 
 logger = logging.getLogger(__name__)
 
+# Display Update Control values followed by Activate Display Update Sequence
+UPDATE_FULL     = [(0x22, [0xF7]), (0x20, None)]
+UPDATE_FAST     = [(0x22, [0xC7]), (0x20, None)]    # fast:0x0c, quality:0x0f, 0xcf
+UPDATE_PART     = [(0x22, [0xFF]), (0x20, None)]
+
 class EPD:
     def __init__(self):
         self.reset_pin = epdconfig.RST_PIN
@@ -86,6 +91,14 @@ class EPD:
         epdconfig.digital_write(self.cs_pin, 0)
         epdconfig.spi_writebyte2(data)
         epdconfig.digital_write(self.cs_pin, 1)
+
+    '''
+    function :send commands with their data in one transaction
+    parameter:
+     sequence : list of (command, data) pairs, data may be None
+    '''
+    def send_sequence(self, sequence):
+        epdconfig.send_sequence(self.dc_pin, self.cs_pin, sequence)
     
     '''
     function :Wait until the busy_pin goes LOW
@@ -93,8 +106,7 @@ class EPD:
     '''
     def ReadBusy(self):
         logger.debug("e-Paper busy")
-        while(epdconfig.digital_read(self.busy_pin) == 1):      # 0: idle, 1: busy
-            epdconfig.delay_ms(10)  
+        epdconfig.wait_busy(self.busy_pin)
         logger.debug("e-Paper busy release")
 
     '''
@@ -102,9 +114,7 @@ class EPD:
     parameter:
     '''
     def TurnOnDisplay(self):
-        self.send_command(0x22) # Display Update Control
-        self.send_data(0xf7)
-        self.send_command(0x20) # Activate Display Update Sequence
+        self.send_sequence(UPDATE_FULL)
         self.ReadBusy()
 
     '''
@@ -112,9 +122,7 @@ class EPD:
     parameter:
     '''
     def TurnOnDisplay_Fast(self):
-        self.send_command(0x22) # Display Update Control
-        self.send_data(0xC7)    # fast:0x0c, quality:0x0f, 0xcf
-        self.send_command(0x20) # Activate Display Update Sequence
+        self.send_sequence(UPDATE_FAST)
         self.ReadBusy()
     
     '''
@@ -122,12 +130,42 @@ class EPD:
     parameter:
     '''
     def TurnOnDisplayPart(self):
-        self.send_command(0x22) # Display Update Control
-        self.send_data(0xff)    # fast:0x0c, quality:0x0f, 0xcf
-        self.send_command(0x20) # Activate Display Update Sequence
+        self.send_sequence(UPDATE_PART)
         self.ReadBusy()
 
 
+    '''
+    function : Commands setting the display window
+    parameter:
+        xstart : X-axis starting position
+        ystart : Y-axis starting position
+        xend : End position of X-axis
+        yend : End position of Y-axis
+    '''
+    def window_sequence(self, x_start, y_start, x_end, y_end):
+        return [
+            # SET_RAM_X_ADDRESS_START_END_POSITION
+            # x point must be the multiple of 8 or the last 3 bits will be ignored
+            (0x44, [(x_start>>3) & 0xFF, (x_end>>3) & 0xFF]),
+            # SET_RAM_Y_ADDRESS_START_END_POSITION
+            (0x45, [y_start & 0xFF, (y_start >> 8) & 0xFF, y_end & 0xFF, (y_end >> 8) & 0xFF]),
+        ]
+
+    '''
+    function : Commands setting the cursor
+    parameter:
+        x : X-axis starting position
+        y : Y-axis starting position
+    '''
+    def cursor_sequence(self, x, y):
+        return [
+            # SET_RAM_X_ADDRESS_COUNTER
+            # x point must be the multiple of 8 or the last 3 bits will be ignored
+            (0x4E, [x & 0xFF]),
+            # SET_RAM_Y_ADDRESS_COUNTER
+            (0x4F, [y & 0xFF, (y >> 8) & 0xFF]),
+        ]
+
     '''
     function : Setting the display window
     parameter:
@@ -137,16 +175,7 @@ class EPD:
         yend : End position of Y-axis
     '''
     def SetWindow(self, x_start, y_start, x_end, y_end):
-        self.send_command(0x44) # SET_RAM_X_ADDRESS_START_END_POSITION
-        # x point must be the multiple of 8 or the last 3 bits will be ignored
-        self.send_data((x_start>>3) & 0xFF)
-        self.send_data((x_end>>3) & 0xFF)
-        
-        self.send_command(0x45) # SET_RAM_Y_ADDRESS_START_END_POSITION
-        self.send_data(y_start & 0xFF)
-        self.send_data((y_start >> 8) & 0xFF)
-        self.send_data(y_end & 0xFF)
-        self.send_data((y_end >> 8) & 0xFF)
+        self.send_sequence(self.window_sequence(x_start, y_start, x_end, y_end))
 
     '''
     function : Set Cursor
@@ -155,13 +184,7 @@ class EPD:
         y : Y-axis starting position
     '''
     def SetCursor(self, x, y):
-        self.send_command(0x4E) # SET_RAM_X_ADDRESS_COUNTER
-        # x point must be the multiple of 8 or the last 3 bits will be ignored
-        self.send_data(x & 0xFF)
-        
-        self.send_command(0x4F) # SET_RAM_Y_ADDRESS_COUNTER
-        self.send_data(y & 0xFF)
-        self.send_data((y >> 8) & 0xFF)
+        self.send_sequence(self.cursor_sequence(x, y))
     
     '''
     function : Initialize the e-Paper register
@@ -177,26 +200,15 @@ class EPD:
         self.send_command(0x12)  #SWRESET
         self.ReadBusy() 
 
-        self.send_command(0x01) #Driver output control      
-        self.send_data(0xf9)
-        self.send_data(0x00)
-        self.send_data(0x00)
-    
-        self.send_command(0x11) #data entry mode       
-        self.send_data(0x03)
-
-        self.SetWindow(0, 0, self.width-1, self.height-1)
-        self.SetCursor(0, 0)
-        
-        self.send_command(0x3c)
-        self.send_data(0x05)
-
-        self.send_command(0x21) #  Display update control
-        self.send_data(0x00)
-        self.send_data(0x80)
-    
-        self.send_command(0x18)
-        self.send_data(0x80)
+        self.send_sequence([
+            (0x01, [0xf9, 0x00, 0x00]),     # Driver output control
+            (0x11, [0x03]),                 # data entry mode
+            *self.window_sequence(0, 0, self.width-1, self.height-1),
+            *self.cursor_sequence(0, 0),
+            (0x3c, [0x05]),                 # BorderWavefrom
+            (0x21, [0x00, 0x80]),           # Display update control
+            (0x18, [0x80]),                 # Read built-in temperature sensor
+        ])
         
         self.ReadBusy()
         
@@ -215,27 +227,22 @@ class EPD:
         self.send_command(0x12)  #SWRESET
         self.ReadBusy() 
 
-        self.send_command(0x18) # Read built-in temperature sensor
-        self.send_command(0x80)
-
-        self.send_command(0x11) # data entry mode       
-        self.send_data(0x03)    
-
-        self.SetWindow(0, 0, self.width-1, self.height-1)
-        self.SetCursor(0, 0)
-        
-        self.send_command(0x22) # Load temperature value
-        self.send_data(0xB1)	
-        self.send_command(0x20)
+        self.send_sequence([
+            (0x18, None),                   # Read built-in temperature sensor
+            (0x80, None),
+            (0x11, [0x03]),                 # data entry mode
+            *self.window_sequence(0, 0, self.width-1, self.height-1),
+            *self.cursor_sequence(0, 0),
+            (0x22, [0xB1]),                 # Load temperature value
+            (0x20, None),
+        ])
         self.ReadBusy()
 
-        self.send_command(0x1A) # Write to temperature register
-        self.send_data(0x64)
-        self.send_data(0x00)
-                        
-        self.send_command(0x22) # Load temperature value
-        self.send_data(0x91)	
-        self.send_command(0x20)
+        self.send_sequence([
+            (0x1A, [0x64, 0x00]),           # Write to temperature register
+            (0x22, [0x91]),                 # Load temperature value
+            (0x20, None),
+        ])
         self.ReadBusy()
         
         return 0
@@ -266,9 +273,8 @@ class EPD:
         image : Image data
     '''
     def display(self, image):
-        self.send_command(0x24)
-        self.send_data2(image)  
-        self.TurnOnDisplay()
+        self.send_sequence([(0x24, image), *UPDATE_FULL])
+        self.ReadBusy()
     
     '''
     function : Sends the image buffer in RAM to e-Paper and fast displays
@@ -276,9 +282,8 @@ class EPD:
         image : Image data
     '''
     def display_fast(self, image):
-        self.send_command(0x24)
-        self.send_data2(image) 
-        self.TurnOnDisplay_Fast()
+        self.send_sequence([(0x24, image), *UPDATE_FAST])
+        self.ReadBusy()
     '''
     function : Sends the image buffer in RAM to e-Paper and partial refresh
     parameter:
@@ -289,23 +294,48 @@ class EPD:
         epdconfig.delay_ms(1)
         epdconfig.digital_write(self.reset_pin, 1)  
 
-        self.send_command(0x3C) # BorderWavefrom
-        self.send_data(0x80)
+        self.send_sequence([
+            (0x3C, [0x80]),                 # BorderWavefrom
+            (0x01, [0xF9, 0x00, 0x00]),     # Driver output control
+            (0x11, [0x03]),                 # data entry mode
+            *self.window_sequence(0, 0, self.width - 1, self.height - 1),
+            *self.cursor_sequence(0, 0),
+            (0x24, image),                  # WRITE_RAM
+            *UPDATE_PART,
+        ])
+        self.ReadBusy()
 
-        self.send_command(0x01) # Driver output control      
-        self.send_data(0xF9) 
-        self.send_data(0x00)
-        self.send_data(0x00)
+    '''
+    function : Partial refresh that only sends the changed window, then
+               writes the same window to the base image RAM
+    parameter:
+        image : Image data of the window only, row by row
+        x_start, x_end : Window columns, multiples of 8 and 8n-1
+        y_start, y_end : Window rows
+    '''
+    def displayPartialWindow(self, image, x_start, y_start, x_end, y_end):
+        epdconfig.digital_write(self.reset_pin, 0)
+        epdconfig.delay_ms(1)
+        epdconfig.digital_write(self.reset_pin, 1)
 
-        self.send_command(0x11) # data entry mode       
-        self.send_data(0x03)
+        self.send_sequence([
+            (0x3C, [0x80]),                 # BorderWavefrom
+            (0x01, [0xF9, 0x00, 0x00]),     # Driver output control
+            (0x11, [0x03]),                 # data entry mode
+            *self.window_sequence(x_start, y_start, x_end, y_end),
+            *self.cursor_sequence(x_start >> 3, y_start),
+            (0x24, image),                  # WRITE_RAM
+            *UPDATE_PART,
+        ])
+        self.ReadBusy()
 
-        self.SetWindow(0, 0, self.width - 1, self.height - 1)
-        self.SetCursor(0, 0)
-        
-        self.send_command(0x24) # WRITE_RAM
-        self.send_data2(image)  
-        self.TurnOnDisplayPart()
+        # Other writes assume the full window, restore it afterwards
+        self.send_sequence([
+            *self.cursor_sequence(x_start >> 3, y_start),
+            (0x26, image),
+            *self.window_sequence(0, 0, self.width - 1, self.height - 1),
+            *self.cursor_sequence(0, 0),
+        ])
 
     '''
     function : Refresh a base image
@@ -313,12 +343,40 @@ class EPD:
         image : Image data
     '''
     def displayPartBaseImage(self, image):
-        self.send_command(0x24)
-        self.send_data2(image)  
-                
-        self.send_command(0x26)
-        self.send_data2(image)  
-        self.TurnOnDisplay()
+        self.send_sequence([(0x24, image), (0x26, image), *UPDATE_FULL])
+        self.ReadBusy()
+
+    '''
+    function : Refresh a base image with the fast waveform
+    parameter:
+        image : Image data
+    '''
+    def displayPartBaseImage_fast(self, image):
+        self.send_sequence([(0x24, image), (0x26, image), *UPDATE_FAST])
+        self.ReadBusy()
+
+    '''
+    function : Write the base image RAM without refreshing, keeps it in step
+               with the screen after a partial refresh
+    parameter:
+        image : Image data
+    '''
+    def writeBaseImage(self, image):
+        self.send_sequence([*self.cursor_sequence(0, 0), (0x26, image)])
+    
+    '''
+    function : Write both RAMs without refreshing, restores the controller
+               state after it was woken from deep sleep
+    parameter:
+        image : Image data
+    '''
+    def writeImage(self, image):
+        self.send_sequence([
+            *self.cursor_sequence(0, 0),
+            (0x24, image),
+            *self.cursor_sequence(0, 0),
+            (0x26, image),
+        ])
     
     '''
     function : Clear screen
@@ -331,19 +389,21 @@ class EPD:
             linewidth = int(self.width/8) + 1
         # logger.debug(linewidth)
         
-        self.send_command(0x24)
-        self.send_data2([color] * int(self.height * linewidth))  
-        self.TurnOnDisplay()
+        self.send_sequence([(0x24, bytes([color]) * int(self.height * linewidth)), *UPDATE_FULL])
+        self.ReadBusy()
 
     '''
     function : Enter sleep mode
     parameter:
+        exit_module : Also release GPIO and SPI, for shutdown. Waking
+                      needs init() either way.
     '''
-    def sleep(self):
-        self.send_command(0x10) #enter deep sleep
-        self.send_data(0x01)
+    def sleep(self, exit_module=True):
+        self.send_sequence([(0x10, [0x01])]) #enter deep sleep
         
-        epdconfig.delay_ms(2000)
-        epdconfig.module_exit()
+        if exit_module:
+            # Let the controller settle before its GPIO and SPI are released
+            epdconfig.delay_ms(2000)
+            epdconfig.module_exit()
 
-### END OF FILE ###
\ No newline at end of file
+### END OF FILE ###
@@ -3,6 +3,7 @@
 import os
 import logging
 import time
+import threading
 
 # Standard pin definition for direct ribbon cable connection
 RST_PIN = 17   # Physical pin 11
@@ -18,6 +19,17 @@ logging.info(f"Waveshare config initialized (simulator mode: {SIMULATOR})")
 SPI_PORT        = 0
 SPI_DEVICE      = 0
 
+# SPI clock, the SSD1680 controller accepts writes well above the 4 MHz default
+SPI_SPEED_HZ    = int(os.environ.get('EPD_SPI_SPEED_HZ', '4000000'))
+
+# Largest single spidev transfer, read from the driver's bufsiz at init
+SPI_CHUNK_SIZE  = 4096
+
+# BUSY wait: 'edge' sleeps until the falling edge, 'poll' reads the pin every 10 ms
+BUSY_WAIT_MODE  = os.environ.get('EPD_BUSY_WAIT', 'edge')
+# How long to wait for the edge before falling back to polling
+BUSY_TIMEOUT_MS = int(os.environ.get('EPD_BUSY_TIMEOUT_MS', '10000'))
+
 # GPIO modules and SPI module
 if not SIMULATOR:
     try:
@@ -39,6 +51,9 @@ GPIO_INITIALIZED = False
 SPI_INITIALIZED = False
 spi = None
 
+# Set from the GPIO edge callback when BUSY falls, None while polling
+busy_released = None
+
 def epd_digital_write(pin, value):
     if GPIO_AVAILABLE:
         GPIO.output(pin, value)
@@ -50,12 +65,45 @@ def epd_digital_read(pin):
     if GPIO_AVAILABLE:
         return GPIO.input(pin)
     else:
-        # In simulator mode, always return 1 (not busy)
-        return 1
+        # In simulator mode, always return 0 (not busy)
+        return 0
 
 def epd_delay_ms(delaytime):
     time.sleep(delaytime / 1000.0)
 
+def epd_wait_busy(pin, timeout_ms=BUSY_TIMEOUT_MS):
+    """Block until the BUSY pin reads 0 (idle)
+
+    With edge detection the thread sleeps until the falling edge, so there is
+    no polling latency and no CPU use during a refresh. If no edge arrives
+    within timeout_ms, or edge detection is unavailable, it polls every 10 ms.
+    """
+    if busy_released is not None:
+        # Clear before reading so an edge between the read and the wait is kept
+        busy_released.clear()
+        if epd_digital_read(pin) == 0:
+            return
+        if busy_released.wait(timeout_ms / 1000.0) and epd_digital_read(pin) == 0:
+            return
+        logging.debug("No BUSY edge within timeout, polling")
+
+    while epd_digital_read(pin) == 1:      # 0: idle, 1: busy
+        epd_delay_ms(10)
+
+def _enable_busy_edge():
+    """Register a falling-edge callback on BUSY, keeping polling if that fails"""
+    global busy_released
+
+    if BUSY_WAIT_MODE != 'edge':
+        return
+    event = threading.Event()
+    try:
+        GPIO.add_event_detect(BUSY_PIN, GPIO.FALLING, callback=lambda channel: event.set())
+        busy_released = event
+        logging.debug("BUSY edge detection enabled")
+    except RuntimeError as e:
+        logging.warning(f"BUSY edge detection unavailable, polling instead: {e}")
+
 def spi_transfer(data):
     if SPI_AVAILABLE:
         spi.writebytes(data)
@@ -63,8 +111,41 @@ def spi_transfer(data):
         # In simulator mode, just log the operation
         logging.debug(f"SPI transfer: {data}")
 
+def spi_transfer_bulk(data):
+    """Write a buffer with writebytes2 in chunks of the largest spidev transfer"""
+    if SPI_AVAILABLE:
+        view = memoryview(data if isinstance(data, (bytes, bytearray)) else bytes(data))
+        for start in range(0, len(view), SPI_CHUNK_SIZE):
+            spi.writebytes2(view[start:start + SPI_CHUNK_SIZE])
+    else:
+        logging.debug(f"SPI bulk transfer: {len(data)} bytes")
+
+def send_sequence(dc_pin, cs_pin, sequence):
+    """Send a batch of (command, data) pairs inside one chip-select transaction
+
+    DC is only toggled between the command byte and its data, and each
+    command's data goes out as a single bulk transfer instead of one
+    transaction per byte.
+    """
+    epd_digital_write(cs_pin, 0)
+    for command, data in sequence:
+        epd_digital_write(dc_pin, 0)
+        spi_transfer([command])
+        if data:
+            epd_digital_write(dc_pin, 1)
+            spi_transfer_bulk(data)
+    epd_digital_write(cs_pin, 1)
+
+def _spi_chunk_size():
+    """Read the spidev transfer size limit, falling back to its default"""
+    try:
+        with open('/sys/module/spidev/parameters/bufsiz') as f:
+            return int(f.read().strip())
+    except (OSError, ValueError):
+        return 4096
+
 def module_init():
-    global GPIO_INITIALIZED, SPI_INITIALIZED, spi
+    global GPIO_INITIALIZED, SPI_INITIALIZED, SPI_CHUNK_SIZE, spi
     
     if not SIMULATOR and not GPIO_INITIALIZED and GPIO_AVAILABLE:
         GPIO.setmode(GPIO.BCM)
@@ -73,13 +154,16 @@ def module_init():
         GPIO.setup(DC_PIN, GPIO.OUT)
         GPIO.setup(CS_PIN, GPIO.OUT)
         GPIO.setup(BUSY_PIN, GPIO.IN)
+        _enable_busy_edge()
         
         # SPI initialization
         if not SPI_INITIALIZED and SPI_AVAILABLE:
             spi = spidev.SpiDev()
             spi.open(SPI_PORT, SPI_DEVICE)
-            spi.max_speed_hz = 4000000
+            spi.max_speed_hz = SPI_SPEED_HZ
             spi.mode = 0b00
+            SPI_CHUNK_SIZE = _spi_chunk_size()
+            logging.debug(f"SPI at {SPI_SPEED_HZ} Hz, {SPI_CHUNK_SIZE} byte transfers")
             SPI_INITIALIZED = True
             
         GPIO_INITIALIZED = True
@@ -89,11 +173,14 @@ def module_init():
         return 0
 
 def module_exit():
-    global GPIO_INITIALIZED, SPI_INITIALIZED, spi
+    global GPIO_INITIALIZED, SPI_INITIALIZED, busy_released, spi
     
     if not SIMULATOR:
         if GPIO_INITIALIZED and GPIO_AVAILABLE:
             logging.debug("Cleanup GPIO")
+            if busy_released is not None:
+                GPIO.remove_event_detect(BUSY_PIN)
+                busy_released = None
             GPIO.cleanup([RST_PIN, DC_PIN, CS_PIN, BUSY_PIN])
             GPIO_INITIALIZED = False
             
@@ -108,11 +195,6 @@ def module_exit():
 digital_write = epd_digital_write
 digital_read = epd_digital_read
 delay_ms = epd_delay_ms
+wait_busy = epd_wait_busy
 spi_writebyte = spi_transfer
-
-def spi_writebyte2(data):
-    """Compatibility function for spi_writebyte2"""
-    return spi_transfer(data)
-
-# Make it available at module level
-spi_writebyte2 = spi_writebyte2 
\ No newline at end of file
+spi_writebyte2 = spi_transfer_bulk 
\ No newline at end of file
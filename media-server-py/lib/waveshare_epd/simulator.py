@@ -1,42 +1,221 @@
+import functools
+import json
 import logging
+import os
+import time
+from pathlib import Path
 from PIL import Image
 
+# Typical durations of the 2.13" V4 panel, in seconds, for the waveform of
+# each refresh and for the BUSY periods of the two init sequences
+REFRESH_SECONDS = {
+    'full': 2.0,
+    'fast': 1.5,
+    'partial': 0.3,
+    'init': 0.1,
+    'init_fast': 0.2,
+    'sleep_exit': 2.0,
+}
+
+# Command and parameter bytes the real driver sends around each operation
+SPI_OVERHEAD = {
+    'init': 30,
+    'init_fast': 30,
+    'display': 4,
+    'display_fast': 4,
+    'displayPartial': 27,
+    'displayPartialWindow': 27,
+    'displayPartBaseImage': 5,
+    'writeBaseImage': 6,
+    'writeImage': 12,
+    'Clear': 4,
+    'sleep': 2,
+}
+
 class EPDSimulator:
-    """Simulated EPD class that mimics the behavior of the Waveshare EPD classes"""
-    
-    def __init__(self, width=250, height=122):
+    """Simulated EPD class that mimics the behavior of the Waveshare EPD classes
+
+    Packed buffers are decoded back into images, so what the panel would show
+    can be inspected. Set EPD_SIM_FRAMES_DIR to write a PNG per refresh and
+    EPD_SIM_TIMELINE to append one JSON line per operation. Refresh and BUSY
+    durations are modelled on the real panel. They are only slept through
+    with EPD_SIM_REALTIME=1; otherwise they are added to the stats.
+    """
+
+    def __init__(self, width=122, height=250):
         self.width = width
         self.height = height
         self.FULL_UPDATE = 0
         self.PART_UPDATE = 1
+
+        self.spi_speed_hz = int(os.environ.get('EPD_SPI_SPEED_HZ', '4000000'))
+        self.realtime = os.environ.get('EPD_SIM_REALTIME', '0') == '1'
+        frames_dir = os.environ.get('EPD_SIM_FRAMES_DIR')
+        self.frames_dir = Path(frames_dir) if frames_dir else None
+        if self.frames_dir:
+            self.frames_dir.mkdir(parents=True, exist_ok=True)
+        timeline = os.environ.get('EPD_SIM_TIMELINE')
+        self.timeline_path = Path(timeline) if timeline else None
+
+        # Controller RAM: 0x24 is the new image, 0x26 the base partials diff against
+        linewidth = (width + 7) // 8
+        self.ram = bytearray([0xFF] * (linewidth * height))
+        self.base_ram = bytearray(self.ram)
+        # What the panel currently shows
+        self.screen = bytes(self.ram)
+        self.asleep = True
+        self._busy_until = 0.0
+
+        self.stats = {
+            'spi_bytes': 0,
+            'refreshes': {'full': 0, 'fast': 0, 'partial': 0},
+            'busy_seconds': 0.0,
+            'stale_base_partials': 0,
+        }
         logging.info(f"EPD Simulator initialized with size {width}x{height}")
-    
+
+    def _account(self, operation, data_bytes=0, busy=None):
+        """Count SPI traffic and model the BUSY time of an operation"""
+        sent = SPI_OVERHEAD.get(operation, 0) + data_bytes
+        self.stats['spi_bytes'] += sent
+        duration = sent * 8 / self.spi_speed_hz
+        if busy:
+            duration += REFRESH_SECONDS[busy]
+        self.stats['busy_seconds'] += duration
+        self._busy_until = time.monotonic() + duration
+
+        if self.timeline_path:
+            event = {'t': time.time(), 'op': operation, 'spi_bytes': sent, 'seconds': round(duration, 4)}
+            with open(self.timeline_path, 'a') as f:
+                f.write(json.dumps(event) + '\n')
+        return duration
+
+    def _refresh(self, mode, operation, data_bytes):
+        """Show RAM 0x24 on the simulated screen"""
+        if self.asleep:
+            logging.warning(f"EPD simulator: {operation} while the panel is asleep")
+        if mode == 'partial' and bytes(self.base_ram) != self.screen:
+            # The controller would diff against an image that isn't on screen
+            self.stats['stale_base_partials'] += 1
+            logging.warning("EPD simulator: partial refresh against a stale base image")
+
+        self.stats['refreshes'][mode] += 1
+        self._account(operation, data_bytes, busy=mode)
+        self.screen = bytes(self.ram)
+        self.ReadBusy()
+
+        if self.frames_dir:
+            index = sum(self.stats['refreshes'].values())
+            self.decode(self.screen).save(self.frames_dir / f"{index:05d}-{mode}.png")
+        logging.info(f"EPD {mode} refresh (simulated)")
+
+    def decode(self, buffer):
+        """Turn a packed buffer back into the landscape image it was made from"""
+        image = Image.frombytes('1', (self.width, self.height), bytes(buffer))
+        return image.rotate(-90, expand=True)
+
+    def snapshot(self):
+        """Image of what the simulated panel currently shows"""
+        return self.decode(self.screen)
+
+    def ReadBusy(self):
+        remaining = self._busy_until - time.monotonic()
+        if self.realtime and remaining > 0:
+            time.sleep(remaining)
+
     def init(self, update=0):
         logging.info(f"EPD init (simulated) with update mode {update}")
+        self.asleep = False
+        self._account('init', busy='init')
+        self.ReadBusy()
+        return 0
+
+    def init_fast(self):
+        logging.info("EPD init_fast (simulated)")
+        self.asleep = False
+        self._account('init_fast', busy='init_fast')
+        self.ReadBusy()
         return 0
-    
-    def Clear(self):
-        logging.info("EPD Clear (simulated)")
+
+    def Clear(self, color=0xFF):
+        self.ram[:] = bytes([color]) * len(self.ram)
+        self._refresh('full', 'Clear', len(self.ram))
         return 0
-    
+
     def display(self, image_buffer):
-        logging.info("EPD display update (simulated)")
+        self.ram[:] = image_buffer
+        self._refresh('full', 'display', len(image_buffer))
+        return 0
+
+    def display_fast(self, image_buffer):
+        self.ram[:] = image_buffer
+        self._refresh('fast', 'display_fast', len(image_buffer))
+        return 0
+
+    def displayPartial(self, image_buffer):
+        self.ram[:] = image_buffer
+        self._refresh('partial', 'displayPartial', len(image_buffer))
+        return 0
+
+    def _write_window(self, ram, image_buffer, x_start, y_start, x_end, y_end):
+        linewidth = (self.width + 7) // 8
+        first, count = x_start >> 3, (x_end >> 3) - (x_start >> 3) + 1
+        for index, row in enumerate(range(y_start, y_end + 1)):
+            offset = row * linewidth + first
+            ram[offset:offset + count] = image_buffer[index * count:(index + 1) * count]
+
+    def displayPartialWindow(self, image_buffer, x_start, y_start, x_end, y_end):
+        self._write_window(self.ram, image_buffer, x_start, y_start, x_end, y_end)
+        self._refresh('partial', 'displayPartialWindow', len(image_buffer))
+        self._write_window(self.base_ram, image_buffer, x_start, y_start, x_end, y_end)
+        self._account('writeBaseImage', len(image_buffer))
+        return 0
+
+    def displayPartBaseImage(self, image_buffer):
+        self.ram[:] = image_buffer
+        self.base_ram[:] = image_buffer
+        self._refresh('full', 'displayPartBaseImage', 2 * len(image_buffer))
+        return 0
+
+    def displayPartBaseImage_fast(self, image_buffer):
+        self.ram[:] = image_buffer
+        self.base_ram[:] = image_buffer
+        self._refresh('fast', 'displayPartBaseImage', 2 * len(image_buffer))
+        return 0
+
+    def writeBaseImage(self, image_buffer):
+        self.base_ram[:] = image_buffer
+        self._account('writeBaseImage', len(image_buffer))
         return 0
-    
-    def sleep(self):
+
+    def writeImage(self, image_buffer):
+        self.ram[:] = image_buffer
+        self.base_ram[:] = image_buffer
+        self._account('writeImage', 2 * len(image_buffer))
+        return 0
+
+    def sleep(self, exit_module=True):
         logging.info("EPD sleep (simulated)")
+        self.asleep = True
+        # The driver waits for the controller to settle before releasing it
+        self._account('sleep', busy='sleep_exit' if exit_module else None)
+        self.ReadBusy()
         return 0
-    
+
     def getbuffer(self, image):
-        logging.info("EPD getbuffer (simulated)")
-        width, height = image.size
-        buffer_size = ((width + 7) // 8) * height
-        return bytearray([0xFF] * buffer_size)
+        imwidth, imheight = image.size
+        if (imwidth, imheight) == (self.width, self.height):
+            img = image.convert('1')
+        elif (imwidth, imheight) == (self.height, self.width):
+            img = image.rotate(90, expand=True).convert('1')
+        else:
+            logging.warning(f"Wrong image dimensions: must be {self.width}x{self.height}")
+            return bytearray(len(self.ram))
+        return bytearray(img.tobytes('raw'))
 
 # Create a module function to get the appropriate EPD class
 def get_epd_class(epd_name):
     """Returns a simulated EPD class based on the name"""
-    if epd_name == "epd2in13_V3":
-        return EPDSimulator(width=122, height=250)
+    # The V3 and V4 2.13" panels share the 122x250 geometry
     # Add more display types as needed
-    return EPDSimulator() 
\ No newline at end of file
+    return functools.partial(EPDSimulator, width=122, height=250)
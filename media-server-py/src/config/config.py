@@ -1,12 +1,83 @@
+import os
+from typing import List, Optional
+
 class MQTTConfig:
     def __init__(self):
         self.port = 1883
         self.host = "mqtt"  # This will resolve to the mqtt service name in docker-compose
+        # Persistent session: with a fixed client id and clean_session off, the
+        # broker keeps our subscriptions and queues QoS 1 messages while we are away
+        self.client_id = os.environ.get('MQTT_CLIENT_ID', 'media-server')
+        self.clean_session = False
+        # Reconnect delays grow exponentially between these bounds, in seconds, with full jitter
+        self.reconnect_min_delay = 0.02
+        self.reconnect_max_delay = 30.0
+        # With zones configured, each zone's topics are <prefix>/<zone>/<topic>
+        self.zone_topic_prefix = "zone"
         self.url_topic = "nfc/url"
         self.audio_state_topic = "media-server/audio-state"
+        # Optional: tag UID, published by the reader as soon as a tag is detected
+        self.tag_uid_topic = "nfc/uid"
+        # UID to URL mappings learned from UID and URL pairs
+        self.tag_registry_file = os.environ.get('TAG_REGISTRY_FILE', '/data/state/tag-registry.json')
+        # A URL arriving within this many seconds of a UID belongs to that tag
+        self.tag_uid_window_seconds = 5.0
+        # Queue overflow policy and size per topic; anything else gets the default.
+        # Policies are "fifo", "drop-oldest" and "latest-wins".
+        self.topic_queues = {
+            self.url_topic: ("latest-wins", 1),
+            self.tag_uid_topic: ("latest-wins", 1),
+        }
+        self.default_topic_queue = ("fifo", 16)
+        # Minimum seconds between publishes on a topic; while waiting, newer
+        # state replaces older
+        self.publish_interval = 1.0
+        # Subscription QoS per topic, 0 for anything else. Taps must survive broker blips.
+        self.topic_qos = {
+            self.url_topic: 1,
+        }
+        # Topics where a new message cancels the handling of the previous one,
+        # so the last tag tapped plays instead of each one loading in turn
+        self.cancel_running_topics = {self.url_topic}
+        # A resting tag is re-read and republished; repeats of the same URL
+        # closer together than this count as one tap
+        self.url_debounce_seconds = 3.0
+        # What tapping the tag that is already playing does:
+        # "ignore", "restart" or "toggle-pause"
+        self.same_url_policy = "ignore"
+
+    def zone_topic(self, zone: Optional[str], topic: str) -> str:
+        """A zone's own version of topic; the unnamed single zone uses topic as is"""
+        return f"{self.zone_topic_prefix}/{zone}/{topic}" if zone else topic
+
+class ZoneConfig:
+    """A room with its own reader topics, audio device and optionally the display"""
+    def __init__(self, name: Optional[str], audio_device: str, display: bool):
+        if name and any(c in name for c in '/+#'):
+            raise ValueError(f"Zone names can't contain '/', '+' or '#': {name}")
+        self.name = name
+        self.audio_device = audio_device
+        self.display = display
+
+def load_zones() -> List[ZoneConfig]:
+    """Zones from ZONES, e.g. "living-room,kitchen", with per zone settings in
+    ZONE_<NAME>_AUDIO_DEVICE and ZONE_<NAME>_DISPLAY ("eink" or "none")
+    """
+    names = [name.strip() for name in os.environ.get('ZONES', '').split(',') if name.strip()]
+    if not names:
+        # A single room on the plain topics
+        return [ZoneConfig(None, os.environ.get('AUDIO_DEVICE', 'hw:1,0'), True)]
+    zones = []
+    for index, name in enumerate(names):
+        prefix = 'ZONE_' + name.upper().replace('-', '_') + '_'
+        # There is one panel, which by default belongs to the first zone
+        display = os.environ.get(prefix + 'DISPLAY', 'eink' if index == 0 else 'none')
+        zones.append(ZoneConfig(name, os.environ.get(prefix + 'AUDIO_DEVICE', 'hw:1,0'), display == 'eink'))
+    return zones
 
 class Config:
     def __init__(self):
         self.mqtt = MQTTConfig()
+        self.zones = load_zones()
 
 config = Config() 
\ No newline at end of file
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Runs a scripted playback session against the e-ink simulator and reports
+refresh counts, SPI traffic and modelled panel time. Runs without a Pi.
+
+Set EPD_SIM_FRAMES_DIR to also write every refresh as a PNG.
+"""
+import os
+import sys
+import json
+import time
+import logging
+
+# The simulator has to be selected before the display modules are imported
+os.environ['WAVESHARE_SIMULATOR'] = '1'
+
+src_dir = os.path.dirname(os.path.abspath(__file__))
+if src_dir not in sys.path:
+    sys.path.append(src_dir)
+
+from services.display.eink_manager import EinkDisplayManager
+
+def run_session(display, title="Benchmark Track - A Rather Long Title (Official Audio)", ticks=40):
+    """Tap, load, play through a track with progress ticks, return to standby"""
+    display.show_loading("Downloading...")
+    display.show_playback(title, "0:00", "3:20", 0)
+    for tick in range(1, ticks + 1):
+        progress = tick / ticks
+        elapsed = int(200 * progress)
+        display._update_progress_section(f"{elapsed // 60}:{elapsed % 60:02d}", "3:20", progress)
+        # The player renders the next tick's frame ahead while it waits
+        display.prerender_progress([(tick + 1) / ticks])
+    display.show_standby()
+
+def main():
+    logging.basicConfig(level=logging.WARNING)
+
+    display = EinkDisplayManager(start_refresh_task=False)
+    epd = display.epd
+    startup = json.loads(json.dumps(epd.stats))
+
+    started = time.perf_counter()
+    run_session(display)
+    cpu_seconds = time.perf_counter() - started
+
+    stats = epd.stats
+    print("Startup:", json.dumps(startup))
+    print("Session:")
+    refreshes = {mode: count - startup['refreshes'][mode] for mode, count in stats['refreshes'].items()}
+    print(f"  refreshes:      {refreshes}")
+    print(f"  spi bytes:      {stats['spi_bytes'] - startup['spi_bytes']}")
+    print(f"  panel seconds:  {stats['busy_seconds'] - startup['busy_seconds']:.2f}")
+    print(f"  stale partials: {stats['stale_base_partials']}")
+    print(f"  cpu seconds:    {cpu_seconds:.3f}")
+
+if __name__ == "__main__":
+    main()
@@ -1,60 +1,88 @@
-from typing import Literal
-from urllib.parse import urlparse
-import yt_dlp
+import re
+from functools import lru_cache
+from typing import Literal, NamedTuple, Optional
 
 MediaType = Literal['youtube-music', 'youtube-video', 'invalid']
 
-SUPPORTED_DOMAINS = {
+SUPPORTED_DOMAINS = frozenset({
     'youtube.com',
-    'youtu.be',
+    'www.youtube.com',
+    'm.youtube.com',
     'music.youtube.com',
-    'www.youtube.com'  # Adding www subdomain which is common
-}
+    'youtu.be',
+})
+
+# scheme://host[:port]/path?query#fragment, scheme optional
+_URL = re.compile(r'^(?:https?://)?(?P<host>[^/?#:]+)(?::\d+)?(?P<path>/[^?#]*)?(?:\?(?P<query>[^#]*))?', re.I)
+# youtu.be/<id>, and youtube.com/shorts/<id>, /embed/<id>, /live/<id> or /v/<id>
+_SHORT_LINK_PATH = re.compile(r'^/(?P<id>[\w-]{11})/?$')
+_VIDEO_PATH = re.compile(r'^/(?:shorts|embed|live|v)/(?P<id>[\w-]{11})/?$')
+_VIDEO_PARAM = re.compile(r'(?:^|&)v=(?P<id>[\w-]{11})(?:&|$)')
+_LIST_PARAM = re.compile(r'(?:^|&)list=(?P<id>[\w-]+)(?:&|$)')
+
+class UrlInfo(NamedTuple):
+    kind: MediaType
+    video_id: Optional[str] = None
+    playlist_id: Optional[str] = None
+    canonical_url: Optional[str] = None
+
+INVALID = UrlInfo('invalid')
 
 async def identify_url(url: str) -> MediaType:
     """
     Identifies and validates a URL to determine its media type.
     """
-    try:
-        print(f"Identifying URL: {url}")
-        media_type = determine_media_type(url)
-        if media_type == 'invalid':
-            return media_type
-
-        # Validate URL using yt-dlp
-        # try:
-        #     ydl_opts = {'quiet': True}
-        #     with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-        #         ydl.extract_info(url, download=False)
-        #     return media_type
-        # except yt_dlp.utils.DownloadError:
-        #     print(f"Unable to validate URL with yt-dlp: {url}")
-        #     return 'invalid'
-        # except Exception as e:
-        #     print(f"Unexpected error validating URL: {e}")
-        #     return 'invalid'
-        return media_type
-    except Exception as e:
-        print(f"Error in identify_url: {e}")
-        return 'invalid'
+    print(f"Identifying URL: {url}")
+    return classify_url(url).kind
 
 def determine_media_type(url: str) -> MediaType:
     """
     Determines the media type based on the URL structure.
     """
-    try:
-        parsed_url = urlparse(url)
-        hostname = parsed_url.netloc.lower()
-        
-        if hostname not in SUPPORTED_DOMAINS:
-            return 'invalid'
-        
-        # Check if it's a music URL
-        if (hostname == 'music.youtube.com' or 
-            ('list' in parsed_url.query and 
-             any(domain in hostname for domain in ['youtube.com', 'www.youtube.com']))):
-            return 'youtube-music'
-        
-        return 'youtube-video'
-    except Exception:
-        return 'invalid' 
\ No newline at end of file
+    return classify_url(url).kind
+
+@lru_cache(maxsize=256)
+def classify_url(url: str) -> UrlInfo:
+    """
+    Classifies a URL without touching the network.
+
+    Tags are tapped over and over, so results are memoized. The canonical URL
+    is the same for every way of writing a link, e.g. youtu.be/<id>,
+    m.youtube.com/watch?v=<id>&t=30 or /shorts/<id>.
+    """
+    match = _URL.match(url.strip())
+    if not match:
+        return INVALID
+    host = match.group('host').lower()
+    if host not in SUPPORTED_DOMAINS:
+        return INVALID
+    # /watch/?v=<id> is the same page as /watch?v=<id>
+    path = (match.group('path') or '').rstrip('/') or '/'
+    query = match.group('query') or ''
+
+    if host == 'youtu.be':
+        found = _SHORT_LINK_PATH.match(path)
+    elif path == '/watch':
+        found = _VIDEO_PARAM.search(query)
+    else:
+        found = _VIDEO_PATH.match(path)
+    video_id = found.group('id') if found else None
+    param = _LIST_PARAM.search(query)
+    playlist_id = param.group('id') if param else None
+
+    if video_id is None and (playlist_id is None or path not in ('/playlist', '/watch')):
+        if host == 'music.youtube.com':
+            # Albums (/browse/<id>), channels and other music pages are left to yt-dlp
+            return UrlInfo('youtube-music', canonical_url=url.strip())
+        return INVALID
+
+    # Music links and playlists are played as audio
+    music = host == 'music.youtube.com' or playlist_id is not None
+    base = 'https://music.youtube.com' if host == 'music.youtube.com' else 'https://www.youtube.com'
+    if video_id is None:
+        canonical_url = f"{base}/playlist?list={playlist_id}"
+    elif playlist_id is None:
+        canonical_url = f"{base}/watch?v={video_id}"
+    else:
+        canonical_url = f"{base}/watch?v={video_id}&list={playlist_id}"
+    return UrlInfo('youtube-music' if music else 'youtube-video', video_id, playlist_id, canonical_url)
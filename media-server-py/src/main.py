@@ -1,7 +1,12 @@
 import logging
 import asyncio
+from functools import partial
+from typing import Dict, Optional
+from config.config import config
 from services.mqtt_service import MQTTService
 from services.media_player import MediaPlayer
+from services.audio.ytdlp_audio_player import YtDlpAudioPlayer
+from services.audio.download_scheduler import DownloadScheduler
 from handlers.url_handler import identify_url
 from src.shutdown_handler import shutdown_manager
 
@@ -15,20 +20,50 @@ logger = logging.getLogger(__name__)
 class Server:
     def __init__(self):
         self.mqtt_service = MQTTService()
-        self.media_player = MediaPlayer()
+        # One player per zone; all of them share the downloads and the audio cache
+        self.downloads = DownloadScheduler()
+        self.media_players: Dict[Optional[str], MediaPlayer] = {}
+        for zone in config.zones:
+            audio_player = YtDlpAudioPlayer(
+                use_eink_display=zone.display,
+                audio_device=zone.audio_device,
+                downloads=self.downloads,
+                status_topic=config.mqtt.zone_topic(zone.name, config.mqtt.audio_state_topic)
+            )
+            self.media_players[zone.name] = MediaPlayer(audio_player)
+        # The zone that owns the e-ink panel, if any
+        self.display_manager = next((player.audio_player.display_manager
+                                     for player in self.media_players.values()
+                                     if player.audio_player.display_manager), None)
 
     async def start(self):
+        # The broker holds one Will per connection, so it covers the first zone.
+        # Every zone's retained status is reset when its publisher is set.
+        first_zone = self.media_players[config.zones[0].name].audio_player
+        self.mqtt_service.set_will(first_zone.status_topic, first_zone.IDLE_STATUS)
         await self.mqtt_service.start()
-        self.mqtt_service.on('url', self.process_url)
+        self.downloads.streams.start()
+        for zone, media_player in self.media_players.items():
+            self.mqtt_service.on('url', partial(self.process_url, media_player=media_player), zone=zone)
+            self.mqtt_service.on('toggle_pause', media_player.toggle_pause, zone=zone)
+            self.mqtt_service.on('tag_detected', media_player.prefetch, zone=zone)
+            self.mqtt_service.set_now_playing(media_player.now_playing, zone=zone)
+            media_player.set_status_publisher(self.mqtt_service.publish)
+            if zone:
+                logger.info(f"Zone {zone} ready")
         
         # TODO: Add handling for stop and restart buttons
         logger.info("Server started")
 
     async def stop(self):
+        # Publishes the idle status, which stop() below sends before disconnecting
+        for media_player in self.media_players.values():
+            await media_player.audio_player.stop(show_standby=False)
         await self.mqtt_service.stop()
+        self.downloads.streams.stop()
         logger.info("Server stopped")
 
-    async def process_url(self, url: str) -> None:
+    async def process_url(self, url: str, media_player: MediaPlayer) -> None:
         logger.info(f"Processing URL: {url}")
         try:
             media_type = await identify_url(url)
@@ -40,7 +75,7 @@ class Server:
 
             if media_type == 'youtube-music':
                 logger.info('Playing audio from YouTube Music')
-                await self.media_player.play_audio(url)
+                await media_player.play_audio(url)
             elif media_type == 'youtube-video':
                 raise NotImplementedError('YouTube video playback not implemented')
             else:
@@ -52,10 +87,11 @@ class Server:
 async def main():
     logger.info("Running main.py")
     
-    # Set up shutdown handler
-    shutdown_manager.setup()
-    
     server = Server()
+    
+    # Set up shutdown handler, sharing the display the players drive.
+    # Stopping the server first clears the retained playing status.
+    shutdown_manager.setup(server.display_manager, before_exit=server.stop)
     try:
         await server.start()
         
@@ -0,0 +1,166 @@
+import asyncio
+import hashlib
+import os
+import threading
+import urllib.request
+import uuid
+from pathlib import Path
+from typing import Dict, List, Optional
+import yt_dlp
+from .negative_cache import NegativeCache
+from .stream_resolver import ResolvedStream, StreamResolver
+
+class DownloadScheduler:
+    """Audio cache and downloads shared by every zone's player
+
+    A URL is downloaded once however many players ask for it, and at most
+    max_concurrent downloads run at a time. A download is only cancelled
+    once every player waiting for it has given up.
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None, max_concurrent: Optional[int] = None):
+        self.cache_dir = Path(cache_dir or os.environ.get('AUDIO_CACHE_DIR', '/data/audio-cache'))
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        # URLs that failed to play, shared like the cache itself
+        self.unplayable = NegativeCache(self.cache_dir / 'unplayable.json')
+        # Stream URLs resolved during track info lookups, so downloads needn't extract again.
+        # PINNED_URLS lists tags to keep resolved, comma separated.
+        pinned = [url for url in os.environ.get('PINNED_URLS', '').split(',') if url.strip()]
+        # Cached tracks play without a stream URL, so they aren't kept resolved
+        self.streams = StreamResolver(pinned, self.unplayable, cached=lambda url: self.cache_file(url).exists())
+        if max_concurrent is None:
+            max_concurrent = int(os.environ.get('MAX_CONCURRENT_DOWNLOADS', '2'))
+        self._slots = asyncio.Semaphore(max(1, max_concurrent))
+        # url -> [task, number of players waiting for it]
+        self._downloads: Dict[str, List] = {}
+        self.stats = {'started': 0, 'joined': 0, 'cancelled': 0}
+
+    def cache_file(self, url: str) -> Path:
+        """Where the audio of url is cached"""
+        url_hash = hashlib.md5(url.encode()).hexdigest()
+        return self.cache_dir / f"{url_hash}.opus"
+
+    async def download(self, url: str, cache_file: Path) -> None:
+        """Download url to cache_file, joining a download of it that is already running"""
+        entry = self._downloads.get(url)
+        if entry is None:
+            task = asyncio.create_task(self._download(url, cache_file))
+            entry = self._downloads[url] = [task, 0]
+            task.add_done_callback(lambda _: self._finished(url, entry))
+            self.stats['started'] += 1
+        else:
+            print(f"Joining running download of {url}")
+            self.stats['joined'] += 1
+
+        task = entry[0]
+        entry[1] += 1
+        try:
+            # Shielded, so one player giving up doesn't abort it for the others
+            await asyncio.shield(task)
+        finally:
+            entry[1] -= 1
+            if not entry[1] and not task.done():
+                self.stats['cancelled'] += 1
+                task.cancel()
+
+    def _finished(self, url: str, entry: List) -> None:
+        if self._downloads.get(url) is entry:
+            del self._downloads[url]
+        # Failures are raised to the waiting players; don't warn about unretrieved ones
+        entry[0].cancelled() or entry[0].exception()
+
+    async def _download(self, url: str, cache_file: Path) -> None:
+        async with self._slots:
+            await self._run_download(url, cache_file)
+
+    # Bytes per ranged request when fetching a resolved stream
+    STREAM_CHUNK = 10 * 1024 * 1024
+
+    def _job_file(self, cache_file: Path) -> Path:
+        """A file next to cache_file for one download to write to
+        
+        A cancelled download's thread keeps running for a moment, so a new
+        download of the same URL mustn't share its file.
+        """
+        return cache_file.with_name(f"{cache_file.stem}.{uuid.uuid4().hex[:8]}.part")
+
+    def _fetch_stream(self, stream: ResolvedStream, cache_file: Path, cancelled: threading.Event) -> None:
+        """Fetch an already resolved stream URL in ranged chunks, as YouTube throttles whole-file requests"""
+        partial_file = self._job_file(cache_file)
+        try:
+            with open(partial_file, 'wb') as f:
+                start = 0
+                while True:
+                    headers = dict(stream.headers, Range=f"bytes={start}-{start + self.STREAM_CHUNK - 1}")
+                    request = urllib.request.Request(stream.url, headers=headers)
+                    with urllib.request.urlopen(request, timeout=30) as response:
+                        received = 0
+                        while True:
+                            if cancelled.is_set():
+                                raise yt_dlp.utils.DownloadCancelled()
+                            data = response.read(64 * 1024)
+                            if not data:
+                                break
+                            f.write(data)
+                            received += len(data)
+                        # A server ignoring Range sends everything at once
+                        if response.status != 206 or received < self.STREAM_CHUNK:
+                            break
+                    start += received
+            partial_file.replace(cache_file)
+        finally:
+            partial_file.unlink(missing_ok=True)
+
+    async def _run_download(self, url: str, cache_file: Path) -> None:
+        """Download audio to cache, from the resolved stream if there is one, else using yt-dlp"""
+        cancelled = threading.Event()
+        stream = self.streams.get(url)
+        if stream is not None:
+            try:
+                await asyncio.to_thread(self._fetch_stream, stream, cache_file, cancelled)
+                return
+            except asyncio.CancelledError:
+                print(f"Download of {url} cancelled")
+                cancelled.set()
+                raise
+            except OSError as e:
+                # Expired early or refused; extract afresh
+                print(f"Resolved stream failed, downloading with yt-dlp: {e}")
+                self.streams.invalidate(url)
+
+        job_file = self._job_file(cache_file)
+        ydl_opts = {
+            'format': StreamResolver.FORMAT,
+            'outtmpl': str(job_file),
+            'quiet': True,
+            'no_warnings': True,
+            'extract_audio': True,
+            'audio_format': 'opus'
+        }
+
+        # Cancelling the task can't stop the download thread, so a progress
+        # hook aborts the download from inside it once cancelled is set
+        def abort_if_cancelled(progress):
+            if cancelled.is_set():
+                raise yt_dlp.utils.DownloadCancelled()
+        ydl_opts['progress_hooks'] = [abort_if_cancelled]
+
+        def download():
+            try:
+                with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+                    ydl.download([url])
+                job_file.replace(cache_file)
+            finally:
+                # Whatever the download left, including yt-dlp's own partial files
+                for leftover in job_file.parent.glob(job_file.name + '*'):
+                    leftover.unlink(missing_ok=True)
+
+        try:
+            await asyncio.to_thread(download)
+        except asyncio.CancelledError:
+            print(f"Download of {url} cancelled")
+            cancelled.set()
+            raise
+        except Exception as e:
+            print(f"Download error: {e}")
+            raise
@@ -0,0 +1,105 @@
+import json
+import time
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+# Why a URL can't be played
+UNAVAILABLE = 'unavailable'   # removed, private or otherwise gone
+GEO_BLOCKED = 'geo-blocked'   # not available in this country
+INVALID = 'invalid'           # not something yt-dlp can play at all
+
+# yt-dlp error message fragments, checked in order, lower case
+_REASON_PATTERNS = (
+    (GEO_BLOCKED, ('not available in your country', 'geo restrict', 'geo-restrict', 'geo block')),
+    (INVALID, ('unsupported url', 'is not a valid url', 'incomplete youtube id', 'invalid url')),
+    (UNAVAILABLE, ('video unavailable', 'private video', 'has been removed', 'no longer available',
+                   'account associated', 'members-only', 'sign in to confirm your age',
+                   'this video is not available')),
+)
+
+class UnplayableError(Exception):
+    """A URL failed permanently; the player has already shown why"""
+    def __init__(self, url: str, reason: str, message: str):
+        super().__init__(f"{url} is {reason}: {message}")
+        self.url = url
+        self.reason = reason
+
+def classify_error(error: Exception) -> Optional[str]:
+    """Reason for a permanent extraction failure, or None for one worth retrying"""
+    message = str(error).lower()
+    for reason, fragments in _REASON_PATTERNS:
+        if any(fragment in message for fragment in fragments):
+            return reason
+    return None
+
+class NegativeCache:
+    """URLs known not to play, so repeat taps fail at once instead of after extraction
+
+    Entries expire after a TTL depending on the reason, as videos do come back
+    and geo-blocks change. Kept in a JSON file so they survive restarts.
+    """
+
+    TTLS = {
+        UNAVAILABLE: 24 * 3600,
+        GEO_BLOCKED: 24 * 3600,
+        INVALID: 7 * 24 * 3600,
+    }
+
+    def __init__(self, path: Path):
+        self._path = path
+        # url -> {'reason', 'message', 'expires'}, expires in wall clock seconds
+        self._entries: Dict[str, Dict] = {}
+        self.stats = {'hits': 0, 'recorded': 0}
+        self._load()
+
+    def _load(self) -> None:
+        if not self._path.exists():
+            return
+        try:
+            with open(self._path, 'r') as f:
+                self._entries = json.load(f)
+        except Exception as e:
+            print(f"Error loading negative cache: {e}")
+
+    def _save(self) -> None:
+        try:
+            partial_file = self._path.with_suffix('.part')
+            with open(partial_file, 'w') as f:
+                json.dump(self._entries, f)
+            partial_file.replace(self._path)
+        except Exception as e:
+            print(f"Error saving negative cache: {e}")
+
+    def lookup(self, url: str) -> Optional[Tuple[str, str]]:
+        """(reason, message) if url recently failed to play, else None"""
+        entry = self._entries.get(url)
+        if entry is None:
+            return None
+        if entry['expires'] <= time.time():
+            del self._entries[url]
+            self._save()
+            return None
+        self.stats['hits'] += 1
+        return entry['reason'], entry['message']
+
+    def record(self, url: str, error: Exception) -> Optional[str]:
+        """Remember url as unplayable if error is permanent; returns the reason"""
+        reason = classify_error(error)
+        if reason is None:
+            return None
+        self._entries[url] = {
+            'reason': reason,
+            'message': str(error),
+            'expires': time.time() + self.TTLS[reason],
+        }
+        self.stats['recorded'] += 1
+        self._save()
+        return reason
+
+    def clear(self) -> None:
+        self._entries = {}
+        if self._path.exists():
+            self._path.unlink()
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,222 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional
+from urllib.parse import parse_qs, urlparse
+import yt_dlp
+from handlers.url_handler import classify_url
+from .negative_cache import NegativeCache
+
+class ResolvedStream(NamedTuple):
+    url: Optional[str]           # media URL of the selected format, None for playlists
+    headers: Dict[str, str]      # HTTP headers the media URL has to be fetched with
+    expires: float               # wall clock time after which it must be resolved again
+    info: Dict                   # duration, title and thumbnail
+
+class StreamResolver:
+    """Resolved audio stream URLs per video ID, so repeat lookups skip extraction
+
+    Extraction is the slow part of preparing a track. Its result, the media
+    URL of the chosen format, stays valid until the expire= time embedded in
+    it, less a safety margin. Pinned and popular videos that aren't in the
+    audio cache are resolved again before they expire, so they are always
+    ready.
+    """
+
+    # Seconds before the embedded expiry at which a stream URL is no longer used
+    SAFETY_MARGIN = 10 * 60
+    # Lifetime of a stream URL without an expire= parameter
+    DEFAULT_TTL = 30 * 60
+    # Pinned and popular entries are refreshed this long before they expire
+    REFRESH_AHEAD = 15 * 60
+    REFRESH_INTERVAL = 60
+    # Taps after which a video counts as popular
+    POPULAR_HITS = 3
+    # Use counts halve this often, so popularity fades; unused videos are forgotten
+    POPULARITY_HALF_LIFE = 6 * 3600
+    # Refresh retries after a failure back off from REFRESH_INTERVAL up to this
+    MAX_REFRESH_BACKOFF = 6 * 3600
+    MAX_ENTRIES = 64
+
+    FORMAT = 'bestaudio[acodec=opus]/bestaudio'
+
+    def __init__(self, pinned: Iterable[str] = (), unplayable: Optional[NegativeCache] = None,
+                 cached: Optional[Callable[[str], bool]] = None):
+        self._streams: 'OrderedDict[str, ResolvedStream]' = OrderedDict()
+        # video ID -> URL to resolve it from, for refreshes
+        self._sources: Dict[str, str] = {}
+        # video ID -> taps, see record_use()
+        self._uses: Dict[str, int] = {}
+        # URLs known not to play are not refreshed, nor are URLs whose audio is cached
+        self._unplayable = unplayable
+        self._cached = cached
+        # video ID -> (failed refreshes in a row, time of the next attempt)
+        self._failures: Dict[str, tuple] = {}
+        self._last_decay = time.time()
+        self._resolving: Dict[str, asyncio.Task] = {}
+        self._pinned = set()
+        self._task: Optional[asyncio.Task] = None
+        self.stats = {'hits': 0, 'misses': 0, 'expired': 0, 'refreshed': 0}
+        for url in pinned:
+            self.pin(url)
+
+    def pin(self, url: str) -> None:
+        """Keep url resolved at all times"""
+        info = classify_url(url.strip())
+        if info.video_id:
+            self._pinned.add(info.video_id)
+            # The URL taps arrive as, so it names the same cache file
+            self._sources[info.video_id] = info.canonical_url
+
+    def start(self) -> None:
+        """Start refreshing pinned and popular entries in the background"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._keep_fresh())
+
+    def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    def record_use(self, url: str) -> None:
+        """Count a tap of url towards it becoming popular"""
+        key = classify_url(url).video_id
+        if key:
+            self._sources.setdefault(key, url)
+            self._uses[key] = self._uses.get(key, 0) + 1
+
+    def get(self, url: str) -> Optional[ResolvedStream]:
+        """The cached resolution of url if it is still valid, without extracting"""
+        key = classify_url(url).video_id
+        stream = self._streams.get(key) if key else None
+        if stream is None:
+            return None
+        if stream.expires <= time.time():
+            del self._streams[key]
+            self.stats['expired'] += 1
+            return None
+        self._streams.move_to_end(key)
+        return stream
+
+    def invalidate(self, url: str) -> None:
+        """Drop a resolution the server no longer accepts"""
+        key = classify_url(url).video_id
+        if key:
+            self._streams.pop(key, None)
+
+    async def resolve(self, url: str) -> ResolvedStream:
+        """Resolve url, from the cache while the stream URL is valid"""
+        key = classify_url(url).video_id
+        if key is None:
+            # Playlists have no single stream to cache
+            return await asyncio.to_thread(self._extract, url)
+        self._sources.setdefault(key, url)
+        stream = self.get(url)
+        if stream is not None:
+            self.stats['hits'] += 1
+            return stream
+        self.stats['misses'] += 1
+        return await self._resolve_key(key, url)
+
+    async def _resolve_key(self, key: str, url: str) -> ResolvedStream:
+        # Taps in several zones, or a refresh and a tap, share one extraction
+        task = self._resolving.get(key)
+        if task is None:
+            task = asyncio.create_task(asyncio.to_thread(self._extract, url))
+            self._resolving[key] = task
+            task.add_done_callback(lambda _: self._resolving.pop(key, None))
+        stream = await asyncio.shield(task)
+        if stream.url:
+            self._streams[key] = stream
+            self._streams.move_to_end(key)
+            while len(self._streams) > self.MAX_ENTRIES:
+                self._streams.popitem(last=False)
+        return stream
+
+    def _extract(self, url: str) -> ResolvedStream:
+        ydl_opts = {
+            'quiet': True,
+            'no_warnings': True,
+            'extract_flat': True,
+            'format': self.FORMAT
+        }
+        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+            info = ydl.extract_info(url, download=False)
+        stream_url = info.get('url')
+        return ResolvedStream(
+            url=stream_url,
+            headers=dict(info.get('http_headers') or {}),
+            expires=self._expiry(stream_url),
+            info={
+                'duration': info.get('duration', 0),
+                'title': info.get('title', url),
+                'thumbnail': info.get('thumbnail')
+            }
+        )
+
+    def _expiry(self, stream_url: Optional[str]) -> float:
+        now = time.time()
+        if not stream_url:
+            return now
+        expire = parse_qs(urlparse(stream_url).query).get('expire')
+        if expire and expire[0].isdigit():
+            return int(expire[0]) - self.SAFETY_MARGIN
+        return now + self.DEFAULT_TTL
+
+    def _decay(self, now: float) -> None:
+        """Halve use counts once per half life and forget videos nothing needs any more"""
+        # A burst of different tags decays early, which keeps the bookkeeping bounded
+        if now - self._last_decay < self.POPULARITY_HALF_LIFE and len(self._uses) <= 4 * self.MAX_ENTRIES:
+            return
+        self._last_decay = now
+        self._uses = {key: uses // 2 for key, uses in self._uses.items() if uses > 1}
+        for key in list(self._sources):
+            if key not in self._pinned and key not in self._uses and key not in self._streams:
+                del self._sources[key]
+                self._failures.pop(key, None)
+
+    def _refresh_candidates(self, now: float) -> List[str]:
+        """Stale entries among the uncached pinned and most used popular videos
+        
+        Only as many videos are kept fresh as the cache holds, so refreshing
+        one never evicts another that is kept fresh too.
+        """
+        popular = sorted((key for key, uses in self._uses.items()
+                          if uses >= self.POPULAR_HITS and key not in self._pinned),
+                         key=lambda key: self._uses[key], reverse=True)
+        candidates = []
+        for key in (list(self._pinned) + popular)[:self.MAX_ENTRIES]:
+            url = self._sources.get(key)
+            if url is None:
+                continue
+            if self._unplayable is not None and self._unplayable.lookup(url):
+                continue
+            if self._cached is not None and self._cached(url):
+                continue
+            failures = self._failures.get(key)
+            if failures and failures[1] > now:
+                continue
+            stream = self._streams.get(key)
+            if stream is not None and stream.expires - now > self.REFRESH_AHEAD:
+                continue
+            candidates.append(key)
+        return candidates
+
+    async def _keep_fresh(self) -> None:
+        while True:
+            now = time.time()
+            self._decay(now)
+            for key in self._refresh_candidates(now):
+                url = self._sources[key]
+                try:
+                    await self._resolve_key(key, url)
+                    self._failures.pop(key, None)
+                    self.stats['refreshed'] += 1
+                except Exception as e:
+                    print(f"Error refreshing stream of {url}: {e}")
+                    if self._unplayable is not None and isinstance(e, yt_dlp.utils.DownloadError):
+                        self._unplayable.record(url, e)
+                    count = self._failures.get(key, (0, 0))[0] + 1
+                    delay = min(self.REFRESH_INTERVAL * 2 ** count, self.MAX_REFRESH_BACKOFF)
+                    self._failures[key] = (count, time.time() + delay)
+            await asyncio.sleep(self.REFRESH_INTERVAL)
@@ -1,18 +1,40 @@
 from typing import Dict, Callable, List, Optional
 import asyncio
 import os
+import sys
+import io
 import json
 import hashlib
+import urllib.request
 from pathlib import Path
 import vlc
 import yt_dlp
 import time
+from PIL import Image
+from config.config import config
 
 # Import the EinkDisplayManager
 from ..display.eink_manager import EinkDisplayManager
+from ..display.dither import dither_to_1bit
+from .download_scheduler import DownloadScheduler
+from .negative_cache import UnplayableError
 
 class YtDlpAudioPlayer:
-    def __init__(self, use_eink_display=True):
+    # Seconds a speculative prefetch waits for its play() call before it is dropped
+    PREFETCH_TIMEOUT = 10
+    
+    # Error screen detail per reason a URL can't be played
+    UNPLAYABLE_MESSAGES = {
+        'unavailable': "Video unavailable",
+        'geo-blocked': "Not available here",
+        'invalid': "Not a playable link",
+    }
+    
+    # What the status topic says while nothing plays, also the MQTT Will
+    IDLE_STATUS = json.dumps({"is_playing": False})
+    
+    def __init__(self, use_eink_display=True, audio_device: str = 'hw:1,0',
+                 downloads: Optional[DownloadScheduler] = None, status_topic: Optional[str] = None):
         # Debug audio devices
         print("Available audio devices:")
         instance = vlc.Instance()
@@ -24,16 +46,23 @@ class YtDlpAudioPlayer:
             print("No audio devices found!")
         
         # Initialize VLC with ALSA
-        self._vlc_instance = vlc.Instance('--no-xlib', '--aout=alsa', '--alsa-audio-device=hw:1,0')
+        self._vlc_instance = vlc.Instance('--no-xlib', '--aout=alsa', f'--alsa-audio-device={audio_device}')
         self._player = self._vlc_instance.media_player_new()
         self._current_media = None
         self._status = {"is_playing": False}
         self._start_time = 0
+        self._progress_task: Optional[asyncio.Task] = None
+        self._paused_at = 0
+        # (url, task) of a speculative prefetch, see prefetch()
+        self._prefetch = None
+        self.prefetch_stats = {'hits': 0, 'misses': 0, 'expired': 0}
+        # Publishes status over a shared MQTT connection, see set_status_publisher()
+        self._publish: Optional[Callable[..., None]] = None
+        self.status_topic = status_topic or config.mqtt.audio_state_topic
         
-        # Set up cache directory
-        cache_path = os.environ.get('AUDIO_CACHE_DIR', '/data/audio-cache')
-        self._cache_dir = Path(cache_path)
-        self._cache_dir.mkdir(parents=True, exist_ok=True)
+        # The cache directory and downloads may be shared with other zones' players
+        self._downloads = downloads or DownloadScheduler()
+        self._cache_dir = self._downloads.cache_dir
         
         # Event handlers
         self._event_handlers: Dict[str, List[Callable]] = {
@@ -62,6 +91,13 @@ class YtDlpAudioPlayer:
         self.last_update_time = 0
         self.last_progress = 0
         
+        # Terminal progress bar, on by default only when stdout is a terminal
+        terminal_progress = os.environ.get('TERMINAL_PROGRESS', 'auto')
+        if terminal_progress == 'auto':
+            self._terminal_progress = sys.stdout.isatty()
+        else:
+            self._terminal_progress = terminal_progress == '1'
+        
         # Show initial standby screen
         if self.display_manager:
             self.display_manager.show_standby()
@@ -88,14 +124,64 @@ class YtDlpAudioPlayer:
 
     def _get_cache_file_path(self, url: str) -> Path:
         """Generate cache file path from URL"""
-        url_hash = hashlib.md5(url.encode()).hexdigest()
-        return self._cache_dir / f"{url_hash}.opus"
+        return self._downloads.cache_file(url)
         
     def _get_metadata_file_path(self, url: str) -> Path:
         """Generate metadata file path from URL"""
         url_hash = hashlib.md5(url.encode()).hexdigest()
         return self._cache_dir / f"{url_hash}.json"
         
+    def _get_art_file_path(self, url: str) -> Path:
+        """Generate album art file path from URL"""
+        url_hash = hashlib.md5(url.encode()).hexdigest()
+        return self._cache_dir / f"{url_hash}.art"
+        
+    def _load_album_art(self, url: str) -> Optional[Image.Image]:
+        """Load album art that was dithered at ingest; a small read with no image processing"""
+        art_file = self._get_art_file_path(url)
+        if not art_file.exists():
+            return None
+        try:
+            return Image.frombytes('1', EinkDisplayManager.ART_SIZE, art_file.read_bytes())
+        except (OSError, ValueError) as e:
+            print(f"Error loading album art: {e}")
+            return None
+        
+    def _fetch_album_art(self, thumbnail_url: str, art_file: Path) -> Image.Image:
+        """Download a thumbnail, dither it to 1-bit and store it packed"""
+        with urllib.request.urlopen(thumbnail_url, timeout=10) as response:
+            data = response.read()
+        art = dither_to_1bit(Image.open(io.BytesIO(data)), EinkDisplayManager.ART_SIZE)
+        partial_file = art_file.with_suffix('.art.part')
+        partial_file.write_bytes(art.tobytes())
+        partial_file.replace(art_file)
+        return art
+        
+    async def _ingest_album_art(self, url: str, thumbnail_url: Optional[str]) -> Optional[Image.Image]:
+        """Prepare album art for a track once, off the event loop"""
+        if not thumbnail_url or not self._use_eink_display:
+            return None
+        try:
+            return await asyncio.to_thread(self._fetch_album_art, thumbnail_url, self._get_art_file_path(url))
+        except Exception as e:
+            print(f"Error preparing album art: {e}")
+            return None
+        
+    async def _backfill_album_art(self, url: str, track_info: Dict) -> None:
+        """Add art to a track cached without it, showing it if the track is still playing"""
+        try:
+            thumbnail_url = track_info.get('thumbnail')
+            if not thumbnail_url:
+                track_info = await self._get_track_info(url)
+                await self._save_track_metadata(url, track_info)
+                thumbnail_url = track_info.get('thumbnail')
+            art = await self._ingest_album_art(url, thumbnail_url)
+        except Exception as e:
+            print(f"Error backfilling album art: {e}")
+            return
+        if art and self._status.get("current_url") == str(self._get_cache_file_path(url)):
+            self.display_manager.set_album_art(art)
+        
     async def _save_track_metadata(self, url: str, metadata: Dict) -> None:
         """Save track metadata to cache"""
         metadata_file = self._get_metadata_file_path(url)
@@ -117,21 +203,13 @@ class YtDlpAudioPlayer:
         return None
 
     async def _get_track_info(self, url: str) -> Dict:
-        """Get track information using yt-dlp"""
-        ydl_opts = {
-            'quiet': True,
-            'no_warnings': True,
-            'extract_flat': True,
-            'format': 'bestaudio'
-        }
+        """Get track information using yt-dlp
         
+        The same extraction resolves the stream URL, which the download then uses.
+        """
         try:
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                info = await asyncio.to_thread(ydl.extract_info, url, download=False)
-                return {
-                    'duration': info.get('duration', 0),
-                    'title': info.get('title', url)
-                }
+            stream = await self._downloads.streams.resolve(url)
+            return dict(stream.info)
         except Exception as e:
             print(f"Error getting track info: {e}")
             raise
@@ -139,34 +217,30 @@ class YtDlpAudioPlayer:
     async def play(self, url: str) -> None:
         """Play audio from URL"""
         try:
-            # Stop any current playback
-            await self.stop()
+            # A URL that failed recently fails again at once, without extraction
+            known = self._downloads.unplayable.lookup(url)
+            if known:
+                reason, message = known
+                print(f"Not playing {url}, it is {reason}: {message}")
+                await self.stop(show_standby=False)
+                self._show_unplayable(reason)
+                return
+            
+            # Popular tags are kept resolved, in case they drop out of the cache
+            self._downloads.streams.record_use(url)
+            
+            # Stop any current playback; the loading screen replaces it
+            await self.stop(show_standby=False)
             await asyncio.sleep(0.1)  # Small delay for cleanup
 
             # Show loading screen on e-ink display
             if self._use_eink_display and self.display_manager:
                 self.display_manager.show_loading("Downloading...")
 
-            print(f"Checking cache for {url}")
+            track_info = await self._take_prefetch(url)
+            if track_info is None:
+                track_info = await self._prepare_track(url)
             cache_file = self._get_cache_file_path(url)
-            
-            print(f"Cache file: {cache_file}")
-            if not cache_file.exists():
-                print('\n▶️ Downloading...')
-                track_info = await self._get_track_info(url)
-                await self._download_to_cache(url, cache_file)
-                # Save metadata after download
-                await self._save_track_metadata(url, track_info)
-            else:
-                print(f"Cache file found for {url}")
-                # Try to load metadata from cache
-                track_info = await self._load_track_metadata(url)
-                if track_info is None:
-                    # Fall back to online lookup if metadata not cached
-                    print("Metadata not cached, fetching online...")
-                    track_info = await self._get_track_info(url)
-                    await self._save_track_metadata(url, track_info)
-                print('\n▶️ Playing from cache')
 
             print(f"▶️ Playing: {track_info['title']}")
             duration_min = track_info['duration'] // 60
@@ -177,7 +251,8 @@ class YtDlpAudioPlayer:
             if self._use_eink_display:
                 current_time = "0:00"
                 total_time = f"{duration_min}:{duration_sec:02d}"
-                self.display_manager.show_playback(track_info['title'], current_time, total_time, 0)
+                self.display_manager.show_playback(track_info['title'], current_time, total_time, 0,
+                                                   art=self._load_album_art(url))
 
             # Play the cached file
             self._current_media = self._vlc_instance.media_new(str(cache_file))
@@ -186,86 +261,166 @@ class YtDlpAudioPlayer:
             
             self._status = {
                 "is_playing": True,
+                "source_url": url,
                 "current_url": str(cache_file),
                 "duration": track_info['duration'],
                 "title": track_info['title']
             }
             # Get current time safely
             self._start_time = asyncio.get_running_loop().time()
+            # The playback screen above already shows progress 0
+            self.last_update_time = self._start_time
+            self.last_progress = 0
             
             # Start progress updates
-            asyncio.create_task(self._update_progress())
+            self._progress_task = asyncio.create_task(self._update_progress())
+            self._publish_status()
 
             # Update the display
-            self.display_manager.update_display_with_audio_info(
-                track_info['title'],
-                True,
-                "0:00",
-                f"{duration_min}:{duration_sec:02d}",
-                0
-            )
+            if self._use_eink_display and self.display_manager:
+                self.display_manager.update_display_with_audio_info(
+                    track_info['title'],
+                    True,
+                    "0:00",
+                    f"{duration_min}:{duration_sec:02d}",
+                    0
+                )
 
         except Exception as error:
             print(f"Error in play: {error}")
-            await self.stop()
+            reason = None
+            if isinstance(error, yt_dlp.utils.DownloadError):
+                reason = self._downloads.unplayable.record(url, error)
+            await self.stop(show_standby=reason is None)
+            if reason:
+                self._show_unplayable(reason)
+                raise UnplayableError(url, reason, str(error)) from error
             raise
 
-    async def _download_to_cache(self, url: str, cache_file: Path) -> None:
-        """Download audio to cache using yt-dlp"""
-        ydl_opts = {
-            'format': 'bestaudio[acodec=opus]/bestaudio',
-            'outtmpl': str(cache_file),
-            'quiet': True,
-            'no_warnings': True,
-            'extract_audio': True,
-            'audio_format': 'opus'
-        }
+    def _show_unplayable(self, reason: str) -> None:
+        if self._use_eink_display and self.display_manager:
+            self.display_manager.show_error("Can't play", self.UNPLAYABLE_MESSAGES.get(reason, reason))
+
+    async def _prepare_track(self, url: str) -> Dict:
+        """Make sure url is in the cache and return its track info"""
+        print(f"Checking cache for {url}")
+        cache_file = self._get_cache_file_path(url)
         
-        try:
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                await asyncio.to_thread(ydl.download, [url])
-            await self._save_track_metadata(url, await self._get_track_info(url))
-        except Exception as e:
-            print(f"Download error: {e}")
-            raise
+        print(f"Cache file: {cache_file}")
+        if not cache_file.exists():
+            print('\n▶️ Downloading...')
+            track_info = await self._get_track_info(url)
+            # Album art is prepared while the audio downloads
+            await asyncio.gather(
+                self._downloads.download(url, cache_file),
+                self._ingest_album_art(url, track_info.get('thumbnail'))
+            )
+            # Save metadata after download
+            await self._save_track_metadata(url, track_info)
+        else:
+            print(f"Cache file found for {url}")
+            # Try to load metadata from cache
+            track_info = await self._load_track_metadata(url)
+            if track_info is None:
+                # Fall back to online lookup if metadata not cached
+                print("Metadata not cached, fetching online...")
+                track_info = await self._get_track_info(url)
+                await self._save_track_metadata(url, track_info)
+            print('\n▶️ Playing from cache')
+            if self._use_eink_display and not self._get_art_file_path(url).exists():
+                asyncio.create_task(self._backfill_album_art(url, track_info))
+        return track_info
+
+    def prefetch(self, url: str) -> None:
+        """Start caching url ahead of a play() call that is likely to follow
+        
+        Used when a known tag is detected before its URL arrives. play() takes
+        the work over if the URL matches; otherwise it is cancelled.
+        """
+        if self._prefetch and self._prefetch[0] == url:
+            return
+        if self._downloads.unplayable.lookup(url):
+            return
+        self._cancel_prefetch()
+        print(f"Prefetching {url}")
+        
+        if not self._status.get("is_playing") and self._use_eink_display and self.display_manager:
+            self.display_manager.show_loading("Downloading...")
+        
+        task = asyncio.create_task(self._prepare_track(url))
+        # Failures are reported by play(); don't warn about unretrieved ones
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        self._prefetch = (url, task)
+        asyncio.get_running_loop().call_later(self.PREFETCH_TIMEOUT, self._expire_prefetch, task)
+
+    def _cancel_prefetch(self) -> None:
+        if self._prefetch:
+            self._prefetch[1].cancel()
+            self._prefetch = None
+
+    def _expire_prefetch(self, task: asyncio.Task) -> None:
+        """Drop a prefetch whose URL never arrived"""
+        if self._prefetch and self._prefetch[1] is task:
+            print(f"Prefetch of {self._prefetch[0]} expired")
+            self.prefetch_stats['expired'] += 1
+            self._cancel_prefetch()
+            if not self._status.get("is_playing") and self.display_manager:
+                self.display_manager.show_standby()
+
+    async def _take_prefetch(self, url: str) -> Optional[Dict]:
+        """Track info from a prefetch of url, or None; a prefetch of another URL is cancelled"""
+        prefetch, self._prefetch = self._prefetch, None
+        if prefetch is None:
+            return None
+        prefetch_url, task = prefetch
+        if prefetch_url != url:
+            task.cancel()
+            self.prefetch_stats['misses'] += 1
+            return None
+        self.prefetch_stats['hits'] += 1
+        return await task
 
     async def _update_progress(self) -> None:
-        """Update playback progress"""
+        """Update playback progress, sleeping until the next visible change"""
+        loop = asyncio.get_running_loop()
         last_lines = 0
         while self._status.get("is_playing", False):
+            delay = 1
             if "duration" in self._status:
                 # Get current time safely
-                elapsed = asyncio.get_running_loop().time() - self._start_time
-                progress = min(elapsed / self._status["duration"], 1)
-                
-                # Create progress bar
-                width = 30
-                complete = int(progress * width)
-                incomplete = width - complete
-                progress_bar = '█' * complete + '▒' * incomplete
+                elapsed = loop.time() - self._start_time
+                duration = self._status["duration"]
+                progress = min(elapsed / duration, 1) if duration else 1
                 
                 # Calculate times
                 current_time = int(elapsed)
-                total_time = int(self._status["duration"])
+                total_time = int(duration)
                 current_min, current_sec = divmod(current_time, 60)
                 total_min, total_sec = divmod(total_time, 60)
                 
                 current_time_str = f"{current_min}:{current_sec:02d}"
                 total_time_str = f"{total_min}:{total_sec:02d}"
                 
-                # Clear previous lines and redraw progress in terminal
-                if last_lines > 0:
-                    # Move cursor up and clear lines
-                    print(f"\033[{last_lines}A\033[J", end='')
-                
-                # Show new status in terminal
-                print(f"⏯️  {self._status.get('title', 'Unknown')}")
-                print(f"   {progress_bar} {current_time_str}/{total_time_str}")
-                
-                last_lines = 2
+                if self._terminal_progress:
+                    # Create progress bar
+                    width = 30
+                    complete = int(progress * width)
+                    incomplete = width - complete
+                    progress_bar = '█' * complete + '▒' * incomplete
+                    
+                    # Clear previous lines and redraw progress in terminal
+                    if last_lines > 0:
+                        # Move cursor up and clear lines
+                        print(f"\033[{last_lines}A\033[J", end='')
+                    
+                    # Show new status in terminal
+                    print(f"⏯️  {self._status.get('title', 'Unknown')}")
+                    print(f"   {progress_bar} {current_time_str}/{total_time_str}")
+                    
+                    last_lines = 2
                 
                 # Update e-ink display - only update at most every 10 seconds or 5% progress
-                time_now = asyncio.get_running_loop().time()
+                time_now = loop.time()
                 if time_now - self.last_update_time > 10 or abs(progress - self.last_progress) > 0.05:
                     self.last_update_time = time_now
                     self.last_progress = progress
@@ -278,31 +433,123 @@ class YtDlpAudioPlayer:
                             total_time_str,
                             progress
                         )
+                    self._publish_status()
+                    
+                    if self._use_eink_display and self.display_manager:
+                        # Use the idle time until the next tick to prepare its frame
+                        self.display_manager.prerender_progress(
+                            self._upcoming_progress(elapsed, duration)
+                        )
                 
                 if progress >= 1:
                     print("✅ Playback complete")
                     if self._use_eink_display and self.display_manager:
                         self.display_manager.show_standby()
                     break
+                
+                delay = self._next_progress_wakeup(elapsed, duration, time_now)
             
-            await asyncio.sleep(1)
+            await asyncio.sleep(delay)
+        
+        # Finished, or stopped by VLC's end-of-media event
+        self._status["is_playing"] = False
+        self._publish_status()
 
-    async def stop(self) -> None:
+    def _upcoming_progress(self, elapsed: float, duration: float, count: int = 3) -> List[float]:
+        """Progress the next few display updates will most likely show
+        
+        Updates come every 5% or, for long tracks, at the next progress bar
+        pixel once the 10 second rate limit has passed.
+        """
+        if not duration:
+            return []
+        pixel = duration / self.display_manager.progress_resolution()
+        interval = min(max(pixel, 10), 0.05 * duration) + 0.01
+        return [min((elapsed + interval * step) / duration, 1) for step in range(1, count + 1)]
+
+    def _next_progress_wakeup(self, elapsed: float, duration: float, time_now: float) -> float:
+        """Seconds until progress next changes anything visible
+        
+        That is the end of the track, the next 5% step, or the next progress
+        bar pixel once the 10 second rate limit allows an update. The terminal
+        shows seconds, so it still needs a tick every second.
+        """
+        if self._terminal_progress:
+            return 1
+        
+        candidates = [duration - elapsed]
+        if self._use_eink_display and self.display_manager:
+            candidates.append((self.last_progress + 0.05) * duration - elapsed)
+            
+            steps = self.display_manager.progress_resolution()
+            next_pixel = (int(self.last_progress * steps) + 1) / steps * duration
+            rate_limit = 10 - (time_now - self.last_update_time)
+            candidates.append(max(next_pixel - elapsed, rate_limit))
+        else:
+            # Without a display, the published status is the only progress
+            candidates.append(10 - (time_now - self.last_update_time))
+        
+        # Land just past the boundary, the checks above are strict comparisons
+        return max(min(candidates), 0) + 0.01
+
+    async def stop(self, show_standby: bool = True) -> None:
         """Stop playback"""
+        if self._progress_task and self._progress_task is not asyncio.current_task():
+            # Otherwise it would keep running until its next wakeup
+            self._progress_task.cancel()
+        self._progress_task = None
+        # Always, so a retained playing status can't outlive the track
+        self._status = {"is_playing": False}
+        self._publish_status()
         if self._player:
             self._player.stop()
-            self._status = {"is_playing": False}
             
             # Update e-ink display to standby mode
-            if self._use_eink_display:
+            if show_standby and self._use_eink_display:
                 self.display_manager.show_standby()
                 
             self._emit('stopped')
 
             # Update display to standby
-            if self.display_manager:
+            if show_standby and self.display_manager:
                 self.display_manager.show_standby()
 
+    async def toggle_pause(self) -> None:
+        """Pause the current track, or resume it if it is paused"""
+        if not self._status.get("source_url"):
+            return
+        loop = asyncio.get_running_loop()
+        paused = not self._status.get("paused", False)
+        self._player.set_pause(1 if paused else 0)
+        
+        if paused:
+            self._paused_at = loop.time()
+            if self._progress_task:
+                self._progress_task.cancel()
+                self._progress_task = None
+        else:
+            # Elapsed time excludes the pause
+            self._start_time += loop.time() - self._paused_at
+            # Redraw the playback screen on the first progress tick
+            self.last_update_time = 0
+        self._status["paused"] = paused
+        self._status["is_playing"] = not paused
+        
+        if self._use_eink_display and self.display_manager:
+            elapsed = (self._paused_at if paused else loop.time()) - self._start_time
+            duration = self._status.get("duration", 0)
+            self.display_manager.update_display_with_audio_info(
+                self._status.get("title", ""),
+                not paused,
+                self._format_time(elapsed),
+                self._format_time(duration),
+                min(elapsed / duration, 1) if duration else 0
+            )
+        if not paused:
+            self._progress_task = asyncio.create_task(self._update_progress())
+        self._publish_status()
+        print("⏸️ Paused" if paused else "▶️ Resumed")
+
     def get_status(self) -> Dict:
         """Get current playback status"""
         return dict(self._status)
@@ -312,6 +559,7 @@ class YtDlpAudioPlayer:
         try:
             for file in self._cache_dir.glob('*'):
                 file.unlink()
+            self._downloads.unplayable.clear()
             print('Cache cleared successfully')
         except Exception as e:
             print(f'Error clearing cache: {e}')
@@ -341,16 +589,26 @@ class YtDlpAudioPlayer:
         seconds = int(seconds % 60)
         return f"{minutes}:{seconds:02d}" 
 
-    async def _publish_status(self):
-        """Publish current status to MQTT"""
+    def set_status_publisher(self, publish: Callable[..., None]) -> None:
+        """Publish status through publish(topic, payload, retain=...), e.g. MQTTService.publish"""
+        self._publish = publish
+        # Replaces whatever status an earlier run left retained
+        self._publish_status()
+
+    def _publish_status(self) -> None:
+        """Queue the current status for publishing; the publisher coalesces and rate limits"""
+        if not self._publish:
+            return
         try:
-            from aiomqtt import Client
-            from config.config import config
-            
             status = self.get_status()
-            async with Client(hostname=config.mqtt.host, port=config.mqtt.port) as client:
-                payload = json.dumps(status)
-                await client.publish(config.mqtt.audio_state_topic, payload)
-                print(f"Published status to {config.mqtt.audio_state_topic}")
+            duration = status.get("duration", 0)
+            if status.get("source_url"):
+                end = self._paused_at if status.get("paused") else asyncio.get_running_loop().time()
+                elapsed = min(max(end - self._start_time, 0), duration)
+                status["current_time"] = self._format_time(elapsed)
+                status["total_time"] = self._format_time(duration)
+                status["progress"] = elapsed / duration if duration else 0
+            # Retained, so late subscribers get the current state at once
+            self._publish(self.status_topic, json.dumps(status), retain=True)
         except Exception as e:
-            print(f"Error publishing status: {e}") 
\ No newline at end of file
+            print(f"Error publishing status: {e}")
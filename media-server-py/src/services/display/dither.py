@@ -0,0 +1,47 @@
+"""Conversion of album art to the panel's 1-bit palette"""
+from typing import Tuple
+
+import logging
+
+from PIL import Image, ImageOps
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+    logging.warning("numpy not found, album art falls back to PIL dithering")
+
+
+def _bayer_matrix(order: int):
+    """Ordered-dither threshold matrix of size 2**order, scaled to 0-255"""
+    matrix = np.zeros((1, 1), dtype=np.float32)
+    for _ in range(order):
+        matrix = np.block([
+            [4 * matrix, 4 * matrix + 2],
+            [4 * matrix + 3, 4 * matrix + 1],
+        ])
+    return (matrix + 0.5) * (256.0 / matrix.size)
+
+
+_BAYER_8 = _bayer_matrix(3) if NUMPY_AVAILABLE else None
+
+
+def dither_to_1bit(image: Image.Image, size: Tuple[int, int]) -> Image.Image:
+    """Crop and scale image to size and dither it to 1-bit
+
+    Uses a vectorized 8x8 ordered dither, which keeps small art legible and
+    needs no per-pixel Python. Without numpy it falls back to PIL's
+    Floyd-Steinberg conversion.
+    """
+    grey = ImageOps.fit(image.convert('L'), size, Image.LANCZOS)
+    grey = ImageOps.autocontrast(grey)
+    if not NUMPY_AVAILABLE:
+        return grey.convert('1')
+
+    pixels = np.asarray(grey, dtype=np.float32)
+    height, width = pixels.shape
+    reps = (height // 8 + 1, width // 8 + 1)
+    threshold = np.tile(_BAYER_8, reps)[:height, :width]
+    white = np.where(pixels >= threshold, 255, 0).astype(np.uint8)
+    return Image.fromarray(white, 'L').convert('1', dither=Image.Dither.NONE)
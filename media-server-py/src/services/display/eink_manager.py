@@ -1,10 +1,18 @@
-from PIL import Image, ImageDraw, ImageFont
+from PIL import Image, ImageChops, ImageDraw, ImageFont
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
 import os
 from pathlib import Path
 import time
 import asyncio
 import logging
 
+from .frame_cache import Frame, FrameCache
+from .framebuffer import count_changed_pixels, crop_window, panel_window
+from .refresh_scheduler import RefreshScheduler
+from .text_layout import TextLayout
+from .widgets import Compositor, ImageWidget, ProgressBarWidget, StatusIconWidget, TextWidget
+
 # Set simulator mode only if explicitly requested
 SIMULATOR_MODE = os.environ.get('WAVESHARE_SIMULATOR', '0') == '1'
 if SIMULATOR_MODE:
@@ -43,8 +51,9 @@ except ImportError as e:
             PART_UPDATE = 1
             
             def __init__(self):
-                self.width = 250
-                self.height = 122
+                # Panel-native portrait geometry, like the real driver
+                self.width = 122
+                self.height = 250
                 logging.info("Initialized simulated display")
             
             def init(self, update=FULL_UPDATE): 
@@ -66,12 +75,54 @@ except ImportError as e:
                 buffer_size = ((width + 7) // 8) * height
                 return bytearray([0xFF] * buffer_size)
 
+# Refresh modes, from slowest and cleanest to quickest
+REFRESH_FULL = 'full'
+REFRESH_FAST = 'fast'
+REFRESH_PARTIAL = 'partial'
+
 class EinkDisplayManager:
     """Manages display of audio information on Waveshare 2.13" e-ink display"""
     
+    # Waveform per screen: the fast waveform for transient screens, full quality
+    # for screens that stay up and for deghosting
+    SCREEN_REFRESH = {
+        'loading': REFRESH_FAST,
+        'error': REFRESH_FAST,
+        'playback': REFRESH_PARTIAL,
+        'standby': REFRESH_FULL,
+        'deghost': REFRESH_FULL,
+    }
+    
+    # Album art is dithered to this size at ingest, never while drawing
+    ART_SIZE = (48, 48)
+    
+    # Upcoming progress frames kept rendered and packed ahead of their tick
+    RENDER_AHEAD = 3
+    
     def __init__(self, simulation_mode=False, start_refresh_task=True):
-        """Initialize the display"""
-        self.simulation_mode = simulation_mode or SIMULATOR_MODE
+        """Initialize the display
+        
+        simulation_mode skips the panel entirely. With WAVESHARE_SIMULATOR=1 the
+        simulator backend stands in for the panel and every update goes through
+        the same path as on hardware.
+        """
+        self.simulation_mode = simulation_mode
+        
+        # Waveform the panel is currently initialised for, None until init
+        self._panel_mode = None
+        # Whether the panel's base RAM (0x26) holds what is on screen, which
+        # partial refreshes diff against
+        self._base_valid = False
+        
+        # Waking and sleeping the panel run on a single display worker so their
+        # resets and delays overlap rendering instead of blocking it
+        self._worker = ThreadPoolExecutor(max_workers=1, thread_name_prefix='epd')
+        self._panel_job = None
+        self._asleep = False
+        self._powered_down = False
+        # Seconds without updates before the panel goes into deep sleep, 0 for never
+        self.sleep_after = float(os.environ.get('EPD_SLEEP_AFTER', '120'))
+        self._last_activity = time.monotonic()
         
         if not self.simulation_mode:
             try:
@@ -91,6 +142,7 @@ class EinkDisplayManager:
                     self.epd.init()
                     
                 self.epd.Clear()
+                self._panel_mode = REFRESH_FULL
                 self.width = self.epd.height  # Note the width/height swap for proper orientation
                 self.height = self.epd.width
                 logging.info(f"E-ink display V4 initialized: {self.width}x{self.height}")
@@ -106,20 +158,45 @@ class EinkDisplayManager:
             self.FULL_UPDATE = 0
             self.PART_UPDATE = 1
         
-        # Create image buffer
+        # Double-buffered canvases, allocated once: screens are drawn on the back
+        # buffer (self.image) and the front holds what was last sent to the panel
         self.image = Image.new('1', (self.width, self.height), 255)
         self.draw = ImageDraw.Draw(self.image)
+        self._front = Image.new('1', (self.width, self.height), 255)
+        self._front_draw = ImageDraw.Draw(self._front)
+        # Whether the front canvas is known to match the panel
+        self._front_valid = False
+        # Spare canvas for rendering progress frames ahead, keyed by bar fill
+        self._ahead_image = Image.new('1', (self.width, self.height), 255)
+        self._ahead_draw = ImageDraw.Draw(self._ahead_image)
+        self._ahead = OrderedDict()
         
         # Load fonts
         self._load_fonts()
+        self.text_layout = TextLayout()
+        
+        # Retained widget trees for the screens that change while shown
+        self._build_screens()
+        self._active_screen = None
+        
+        # Static screens are rendered once and kept as panel-ready buffers
+        self.frame_cache = FrameCache(
+            (self.width, self.height),
+            self._pack_image,
+            os.environ.get('DISPLAY_CACHE_DIR')
+        )
+        self._logo_path = None
+        self._logo_searched = False
         
         # Track last update time to limit refresh rate
         self.last_update = 0
         self.last_progress = 0
         
-        # Add tracking for full refresh cycles
-        self.last_full_refresh = time.time()
-        self.FULL_REFRESH_INTERVAL = 180  # seconds (3 minutes)
+        # Deghost based on accumulated partial-refresh wear, not a fixed timer
+        self.refresh_scheduler = RefreshScheduler(self.width * self.height)
+        self.REFRESH_CHECK_INTERVAL = 30  # seconds
+        # Last buffer sent to the panel, used to measure how much changed
+        self._front_buffer = None
         
         # Create background refresh task
         self.refresh_task = None
@@ -146,59 +223,229 @@ class EinkDisplayManager:
         
     def truncate_text(self, text, font, max_width):
         """Truncate text to fit within max_width pixels"""
-        if not text:
-            return ""
-            
-        width = self.draw.textlength(text, font=font)
-        if width <= max_width:
-            return text
-            
-        # Truncate and add ellipsis
-        for i in range(len(text), 0, -1):
-            truncated = text[:i] + "..."
-            width = self.draw.textlength(truncated, font=font)
-            if width <= max_width:
-                return truncated
-                
-        return "..."
+        return self.text_layout.truncate(text, font, max_width)
         
     def clear_display(self):
-        """Clear the display"""
-        self.image = Image.new('1', (self.width, self.height), 255)
-        self.draw = ImageDraw.Draw(self.image)
-        
-    def update_display(self, use_partial_update=False):
-        """Update the physical display with current image buffer"""
+        """Clear the back buffer in place"""
+        self.image.paste(255, (0, 0, self.width, self.height))
+        
+    def _dirty_bbox(self):
+        """Bounding box of the pixels that differ between back and front buffers"""
+        return ImageChops.logical_xor(self.image, self._front).getbbox()
+        
+    def _swap_buffers(self):
+        """Make the back buffer the front after it was sent to the panel
+        
+        The new back buffer starts as a copy of the front, so partial redraws
+        only need to touch the regions that change.
+        """
+        self.image, self._front = self._front, self.image
+        self.draw, self._front_draw = self._front_draw, self.draw
+        self.image.paste(self._front)
+        self._front_valid = True
+        
+    def _pack_image(self, image):
+        """Convert a canvas into the panel's packed buffer format"""
         if self.simulation_mode:
-            logging.info(f"Display update (simulated) - Partial: {use_partial_update}")
+            return None
+        return self.epd.getbuffer(image)
+        
+    def _build_screens(self):
+        """Lay out the widgets of the playback and default standby screens"""
+        right = self.width - 10
+        self.playback_screen = Compositor({
+            'title': TextWidget((10, 10, right, 44), self.title_font, self.text_layout),
+            'progress': ProgressBarWidget((10, 50, right, 60)),
+            'status': StatusIconWidget((10, 72, 19, 81)),
+            # Only the total duration is shown, so the text doesn't change every tick
+            'time': TextWidget((160, 70, right, 86), self.normal_font, self.text_layout, align='right'),
+            'art': ImageWidget((30, 66, 30 + self.ART_SIZE[0] - 1, 66 + self.ART_SIZE[1] - 1)),
+        })
+        self.standby_screen = Compositor({
+            'clock': TextWidget((10, self.height - 20, 130, self.height - 5), self.small_font, self.text_layout),
+        })
+        
+    def _enter_screen(self, name, compositor=None):
+        """Note which screen the canvas shows; widgets of a newly entered screen are redrawn"""
+        if self._active_screen == name:
+            return False
+        self._active_screen = name
+        if compositor:
+            compositor.invalidate_all()
+        return True
+        
+    def _show_frame(self, frame: Frame, screen='standby'):
+        """Make a pre-rendered frame the current canvas and push its buffer"""
+        self._enter_screen('frame')
+        self.image.paste(frame.image)
+        self.update_display(buffer=frame.buffer, refresh=self.SCREEN_REFRESH[screen])
+        
+    def _run_on_panel(self, job, *args):
+        """Queue panel I/O on the display worker, after anything already queued"""
+        try:
+            self._panel_job = self._worker.submit(job, *args)
+        except RuntimeError:
+            # The worker is gone, e.g. during interpreter exit; run the job here
+            self._wait_panel()
+            self._panel_job = Future()
+            self._panel_job.set_result(job(*args))
+        return self._panel_job
+        
+    def _wait_panel(self):
+        """Wait for queued panel I/O, such as a wake-up, to finish"""
+        job, self._panel_job = self._panel_job, None
+        if job:
+            job.result()
+        
+    def _wake_panel(self):
+        """Note activity and start waking the panel if it is in deep sleep
+        
+        Called before a frame is rendered, so the reset and init overlap the
+        render and pack; the push then waits for whatever is left of it.
+        """
+        self._last_activity = time.monotonic()
+        if self._asleep and not self.simulation_mode and not self._powered_down:
+            self._asleep = False
+            self._run_on_panel(self._wake)
+            
+    def _wake(self):
+        """Re-initialise the panel after deep sleep, on the display worker"""
+        logging.info("Waking display from deep sleep")
+        self._prepare_panel(REFRESH_FULL)
+        if self._base_valid and self._front_buffer is not None and hasattr(self.epd, 'writeImage'):
+            # Put what is on screen back into both RAMs so partials still work
+            self.epd.writeImage(self._front_buffer)
+        else:
+            self._base_valid = False
+            
+    def sleep_panel(self):
+        """Put the panel into deep sleep without waiting for it"""
+        if self._asleep or self.simulation_mode:
             return
+        logging.info("Putting display into deep sleep")
+        self._asleep = True
+        self._panel_mode = None
+        self._run_on_panel(self._enter_deep_sleep)
         
+    def _enter_deep_sleep(self):
         try:
-            # Log what we're about to do
-            update_mode = self.PART_UPDATE if use_partial_update else self.FULL_UPDATE
-            logging.info(f"Initializing display with mode: {update_mode} (partial={use_partial_update})")
+            # Stay attached to GPIO and SPI so waking up is only a reset and init
+            self.epd.sleep(exit_module=False)
+        except TypeError:
+            self.epd.sleep()
             
+    def _check_for_idle_sleep(self):
+        """Put the panel to sleep once nothing has been drawn for sleep_after seconds"""
+        if self.sleep_after and time.monotonic() - self._last_activity >= self.sleep_after:
+            self.sleep_panel()
+        
+    def _prepare_panel(self, mode):
+        """Initialise the panel for a refresh mode unless it is already set up for it"""
+        if mode == REFRESH_PARTIAL and self._panel_mode is not None:
+            # displayPartial() resets and configures the controller itself
+            return
+        fast = mode == REFRESH_FAST and hasattr(self.epd, 'init_fast')
+        init_mode = REFRESH_FAST if fast else REFRESH_FULL
+        if self._panel_mode == init_mode:
+            return
+        
+        logging.info(f"Initializing display for {init_mode} refresh")
+        if fast:
+            self.epd.init_fast()
+        else:
             # Check if init method accepts update_mode parameter
             try:
                 # Try to initialize with update mode
-                self.epd.init(update_mode)
+                self.epd.init(self.FULL_UPDATE)
             except TypeError:
                 # If error occurs, try calling init() without parameters
                 logging.info("EPD init() doesn't accept parameters, calling without arguments")
                 self.epd.init()
-            
-            # Use the same method as in the working example
-            rotated_image = self.image.rotate(0)  # No rotation if needed
-            buffer = self.epd.getbuffer(rotated_image)
+        self._panel_mode = init_mode
+        
+    def _send_buffer(self, mode, buffer, bbox=None):
+        """Send a packed buffer with the given waveform, keeping the base image in sync
+        
+        For partial refreshes with a known dirty bbox only that window is sent.
+        """
+        if mode == REFRESH_PARTIAL and bbox and hasattr(self.epd, 'displayPartialWindow'):
+            window = panel_window(bbox, self.epd.height)
+            line_bytes = (self.epd.width + 7) // 8
+            self.epd.displayPartialWindow(crop_window(buffer, line_bytes, window), *window)
+            self._panel_mode = REFRESH_PARTIAL
+        elif mode == REFRESH_PARTIAL:
+            self.epd.displayPartial(buffer)
+            self.epd.writeBaseImage(buffer)
+            self._panel_mode = REFRESH_PARTIAL
+        elif self._panel_mode == REFRESH_FAST:
+            if hasattr(self.epd, 'displayPartBaseImage_fast'):
+                self.epd.displayPartBaseImage_fast(buffer)
+                self._base_valid = True
+            else:
+                self.epd.display_fast(buffer)
+        elif hasattr(self.epd, 'displayPartBaseImage'):
+            # Writes both RAM banks so later partial refreshes have a base
+            self.epd.displayPartBaseImage(buffer)
+            self._base_valid = True
+        else:
             self.epd.display(buffer)
-            logging.info(f"Physical display updated successfully - Partial: {use_partial_update}")
+        
+    def update_display(self, use_partial_update=False, buffer=None, refresh=None, regions=None):
+        """Send the back buffer to the panel, using buffer if it is already packed
+        
+        refresh picks the waveform; by default it follows use_partial_update.
+        regions lists the areas redrawn since the last update, when known.
+        Frames identical to what is on screen are skipped.
+        """
+        mode = refresh or (REFRESH_PARTIAL if use_partial_update else REFRESH_FULL)
+        if self._front_valid and regions is not None and not regions:
+            logging.debug("No widgets changed, skipping update")
+            return
+        bbox = self._dirty_bbox() if self._front_valid else None
+        if self._front_valid and bbox is None:
+            logging.info("Display unchanged, skipping update")
+            return
+        
+        if self.simulation_mode:
+            logging.info(f"Display update (simulated) - Mode: {mode}")
+            self._swap_buffers()
+            return
+        
+        if buffer is None:
+            buffer = self._pack_image(self.image)
+        if self._push_buffer(buffer, mode, bbox):
+            self._swap_buffers()
+            
+    def _push_buffer(self, buffer, mode, bbox=None):
+        """Send a packed buffer to the panel and account for it; returns success"""
+        try:
+            self._wake_panel()
+            # A wake-up on the worker may still invalidate the base image
+            self._wait_panel()
+            if mode == REFRESH_PARTIAL and not self._base_valid:
+                # Without a base image the partial diff would ghost badly
+                mode = REFRESH_FULL
+            self._prepare_panel(mode)
+            self._send_buffer(mode, buffer, bbox)
+            
+            changed = count_changed_pixels(self._front_buffer, buffer)
+            self.refresh_scheduler.record_refresh(mode == REFRESH_PARTIAL, changed)
+            self._front_buffer = bytes(buffer)
+            logging.info(f"Physical display updated successfully - Mode: {mode}, {changed} pixels changed")
+            return True
         except Exception as e:
+            # The panel RAM is in an unknown state, start over with a full refresh
+            self._base_valid = False
+            self._panel_mode = None
+            self._front_valid = False
             logging.error(f"Error updating display: {e}")
             import traceback
             logging.error(traceback.format_exc())
+            return False
             
     def show_standby(self):
         """Show standby screen"""
+        self._wake_panel()
         # Try to show the logo as standby screen
         if not self.show_logo():
             # Fall back to default standby screen if logo display fails
@@ -213,55 +460,67 @@ class EinkDisplayManager:
 
     def _show_default_standby(self):
         """Show default standby screen when logo is unavailable"""
-        self.clear_display()
+        if self._enter_screen('standby', self.standby_screen):
+            frame = self.frame_cache.get('standby', self._render_default_standby)
+            self.image.paste(frame.image)
+        
+        # The footer clock is the only part that changes between standbys
+        current_time = time.strftime("%H:%M")  # Removed seconds
+        self.standby_screen.update(clock=f"Time: {current_time}")
+        dirty = self.standby_screen.render(self.draw)
+        
+        # Use full update for standby screen
+        self.update_display(refresh=self.SCREEN_REFRESH['standby'], regions=dirty)
+        
+    def _render_default_standby(self):
+        """Render the static part of the default standby screen"""
+        image = Image.new('1', (self.width, self.height), 255)
+        draw = ImageDraw.Draw(image)
         
         # Draw a bold border to verify display is working
-        self.draw.rectangle((0, 0, self.width-1, self.height-1), outline=0, width=2)
+        draw.rectangle((0, 0, self.width-1, self.height-1), outline=0, width=2)
         
         # Draw a heading
-        self.draw.text((10, 10), "Media Player Ready", font=self.title_font, fill=0)
+        draw.text((10, 10), "Media Player Ready", font=self.title_font, fill=0)
         
         # Draw some informative text
-        self.draw.text((10, 40), "Waiting for", font=self.normal_font, fill=0)
-        self.draw.text((10, 60), "audio input...", font=self.normal_font, fill=0)
-        
-        # Draw a footer
-        current_time = time.strftime("%H:%M")  # Removed seconds
-        self.draw.text((10, self.height - 20), f"Time: {current_time}", font=self.small_font, fill=0)
-        
-        # Use full update for standby screen
-        self.update_display(use_partial_update=False)
+        draw.text((10, 40), "Waiting for", font=self.normal_font, fill=0)
+        draw.text((10, 60), "audio input...", font=self.normal_font, fill=0)
+        return image
         
     def show_loading(self, text="Loading..."):
         """Show loading screen"""
+        self._wake_panel()
+        self._enter_screen('loading')
         self.clear_display()
         self.draw.text((10, 30), text, font=self.title_font, fill=0)
         
-        # Use full update for loading screen
-        self.update_display(use_partial_update=False)
-        
-    def show_playback(self, title, current_time, total_time, progress):
-        """Show playback information"""
-        # Check if only the progress and time need update (for partial refresh)
-        progress_only_update = (
-            title == self.current_title and 
-            abs(progress - self.current_progress) < 0.5  # Only significant progress changes
-        )
+        # Loading screens are short-lived, use the fast waveform
+        self.update_display(refresh=self.SCREEN_REFRESH['loading'])
         
-        if progress_only_update:
-            # Just update the progress section
-            self._update_progress_section(current_time, total_time, progress)
-            return
-            
-        # Full screen update needed
+    def show_error(self, text, detail=""):
+        """Show an error screen, e.g. for a tag whose track can't be played"""
+        self._wake_panel()
+        self._enter_screen('error')
         self.clear_display()
+        self.draw.text((10, 30), text, font=self.title_font, fill=0)
+        if detail:
+            detail = self.truncate_text(detail, self.normal_font, self.width - 20)
+            self.draw.text((10, 70), detail, font=self.normal_font, fill=0)
         
-        # Title (truncate if too long)
-        title_truncated = self.truncate_text(title, self.title_font, self.width - 20)
-        self.draw.text((10, 10), title_truncated, font=self.title_font, fill=0)
+        self.update_display(refresh=self.SCREEN_REFRESH['error'])
+        
+    def show_playback(self, title, current_time, total_time, progress, playing=True, art=None):
+        """Show playback information, redrawing only the widgets that changed
+        
+        art is a pre-dithered 1-bit image of ART_SIZE; it is only pasted here.
+        """
+        self._wake_panel()
+        if self._enter_screen('playback', self.playback_screen):
+            self.clear_display()
         
-        # Draw progress bar and time
-        self._draw_progress_bar(current_time, total_time, progress)
+        self.playback_screen['progress'].set_progress(progress)
+        self.playback_screen.update(title=title, time=total_time, status=playing, art=art)
         
         # Store current values
         self.current_title = title
@@ -269,63 +528,61 @@ class EinkDisplayManager:
         self.total_time = total_time
         self.current_progress = progress
         
-        # Use full update for full screen refresh
-        self.update_display(use_partial_update=False)
+        self._render_playback()
+    
+    def set_album_art(self, art):
+        """Set the album art, redrawing it if the playback screen is showing"""
+        self.playback_screen.update(art=art)
+        if self._active_screen == 'playback':
+            self._render_playback()
+    
+    def _render_playback(self):
+        """Draw and send the changed playback widgets
+        
+        When only the progress bar moved and its frame was rendered ahead, the
+        ready buffer is sent instead of packing the canvas again.
+        """
+        bar = self.playback_screen['progress']
+        if any(widget.invalid for widget in self.playback_screen.widgets.values() if widget is not bar):
+            # Frames rendered ahead show the old title, time or art
+            self._ahead.clear()
+        
+        dirty = self.playback_screen.render(self.draw)
+        buffer = None
+        if dirty == [bar.bounds]:
+            buffer = self._ahead.pop(bar.state, None)
+        self.update_display(buffer=buffer, refresh=self.SCREEN_REFRESH['playback'], regions=dirty)
+    
+    def prerender_progress(self, progress_values):
+        """Render and pack upcoming progress frames while the display is idle
+        
+        Frames are drawn on a spare canvas from the current playback screen and
+        kept until their tick, or until anything but the bar changes.
+        """
+        if self._active_screen != 'playback' or self.simulation_mode:
+            return
+        bar = self.playback_screen['progress']
+        for progress in progress_values:
+            fill = bar.fill_for(progress)
+            if fill == bar.state or fill in self._ahead:
+                continue
+            self._ahead_image.paste(self.image)
+            self._ahead_draw.rectangle(bar.bounds, fill=255)
+            bar.paint(self._ahead_draw, fill)
+            self._ahead[fill] = bytes(self._pack_image(self._ahead_image))
+            if len(self._ahead) > self.RENDER_AHEAD:
+                self._ahead.popitem(last=False)
     
     def _update_progress_section(self, current_time, total_time, progress):
         """Update only the progress bar and time sections (for partial refresh)"""
         logging.info(f"Doing partial update for progress: {progress:.2f}")
-        
-        # Calculate positions
-        bar_width = self.width - 20
-        bar_height = 10
-        bar_left = 10
-        bar_top = 50
-        
-        # Clear just the progress bar and time area
-        self.draw.rectangle(
-            (bar_left - 2, bar_top - 2, bar_left + bar_width + 2, self.height - 10),
-            fill=255
-        )
-        
-        # Redraw progress bar and time
-        self._draw_progress_bar(current_time, total_time, progress)
-        
-        # Store current values
-        self.current_time = current_time
-        self.total_time = total_time
-        self.current_progress = progress
-        
-        # Use partial update for minimal refresh
-        logging.info("Using PARTIAL UPDATE for progress bar")
-        self.update_display(use_partial_update=True)
+        self.show_playback(self.current_title, current_time, total_time, progress,
+                           playing=self.playback_screen['status'].state,
+                           art=self.playback_screen['art'].state)
     
-    def _draw_progress_bar(self, current_time, total_time, progress):
-        """Draw progress bar and time display"""
-        # Progress bar
-        bar_width = self.width - 20
-        bar_height = 10
-        bar_left = 10
-        bar_top = 50
-        
-        # Draw progress bar outline
-        self.draw.rectangle((bar_left, bar_top, bar_left + bar_width, bar_top + bar_height), outline=0)
-        
-        # Draw progress bar fill
-        fill_width = int(progress * bar_width)
-        if fill_width > 0:
-            self.draw.rectangle(
-                (bar_left, bar_top, bar_left + fill_width, bar_top + bar_height),
-                fill=0
-            )
-        
-        # Only show total duration, not current time
-        # This prevents constant updating of the time display
-        # Position text at right edge of progress bar, with small margin
-        time_text = total_time
-        text_width = self.draw.textlength(time_text, font=self.normal_font)
-        text_x = (bar_left + bar_width) - text_width
-        self.draw.text((text_x, 70), time_text, font=self.normal_font, fill=0)
+    def progress_resolution(self):
+        """Number of distinct steps the progress bar can show"""
+        return self.playback_screen['progress'].resolution
     
     def _parse_time_to_seconds(self, time_str):
         """Convert a time string (MM:SS) to seconds"""
@@ -338,7 +595,11 @@ class EinkDisplayManager:
             return 0
     
     async def update_progress_display(self, title, current_time, total_time, progress):
-        """Update the display with current progress (with rate limiting)"""
+        """Update the display with current progress
+        
+        The player already rate limits and schedules these calls for when the
+        progress bar visibly changes, so they are not throttled again here.
+        """
         # Check if periodic refresh is needed
         refresh_performed = self._check_for_periodic_refresh()
         if refresh_performed:
@@ -348,25 +609,14 @@ class EinkDisplayManager:
         # Store current values for future reference
         self.is_playing = True
         
-        # Rate limit updates to avoid flickering and extend display life
-        current_time_sec = time.time()
-        
-        # Calculate percentage change in progress
-        progress_delta = abs(progress - self.current_progress)
-        
-        # Only update if:
-        # 1. It's been at least 10 seconds since last update, or
-        # 2. Progress has changed by at least 5%
-        if (current_time_sec - self.last_update < 10.0 and progress_delta < 0.05):
-            return
-        
         # Remember last update time
-        self.last_update = current_time_sec
+        self.last_update = time.time()
         
         # Determine if we need full refresh or partial refresh
         if title != self.current_title:
             # Title changed - do a full refresh
-            self.show_playback(title, current_time, total_time, progress)
+            self.show_playback(title, current_time, total_time, progress,
+                               art=self.playback_screen['art'].state)
         else:
             # Only progress changed - use partial refresh
             self._update_progress_section(current_time, total_time, progress)
@@ -377,10 +627,11 @@ class EinkDisplayManager:
         try:
             while self.refresh_task_running:
                 # Sleep first to avoid immediate refresh after initialization
-                await asyncio.sleep(60) # Check every 30 seconds
+                await asyncio.sleep(self.REFRESH_CHECK_INTERVAL)
                 
                 if self.refresh_task_running:  # Check again after sleep
                     self._check_for_periodic_refresh()
+                    self._check_for_idle_sleep()
         except Exception as e:
             logging.error(f"Error in refresh task: {e}")
         finally:
@@ -406,26 +657,47 @@ class EinkDisplayManager:
             logging.info("Stopping display refresh background task")
             
     def cleanup(self):
-        """Clean up the display when shutting down"""
+        """Clean up the display when shutting down
+        
+        Clearing and powering down the panel run on the display worker. The
+        returned future completes once the panel is asleep; it is None in
+        simulation mode.
+        """
         # Stop the refresh task first
         self.stop_refresh_task()
         
-        if not self.simulation_mode:
-            try:
-                # Clear the display before sleeping for safer long-term storage
-                self.clear_display()
-                self.update_display(use_partial_update=False)
-                self.epd.sleep()
-            except Exception as e:
-                logging.error(f"Error putting display to sleep: {e}")
+        if self.simulation_mode or self._powered_down:
+            return None
+        
+        # Clear the display before sleeping for safer long-term storage
+        self.clear_display()
+        buffer = bytes(self._pack_image(self.image))
+        self._asleep = True
+        self._powered_down = True
+        future = self._run_on_panel(self._power_down, buffer)
+        self._worker.shutdown(wait=False)
+        return future
+        
+    def _power_down(self, buffer):
+        """Show buffer and put the panel into deep sleep for good"""
+        try:
+            # Always initialise: the panel may be in deep sleep, possibly put
+            # there by another manager instance this one knows nothing about
+            self._panel_mode = None
+            self._prepare_panel(REFRESH_FULL)
+            self._send_buffer(REFRESH_FULL, buffer)
+            self.epd.sleep()
+        except Exception as e:
+            logging.error(f"Error putting display to sleep: {e}")
+        finally:
+            self._panel_mode = None
+            self._base_valid = False
 
     def _check_for_periodic_refresh(self):
-        """Check if we need to perform a periodic full refresh"""
-        current_time = time.time()
-        if current_time - self.last_full_refresh > self.FULL_REFRESH_INTERVAL:
-            logging.info(f"Performing scheduled full refresh (interval: {self.FULL_REFRESH_INTERVAL}s)")
+        """Deghost once partial-refresh wear crosses its budget, preferably while idle"""
+        if self.refresh_scheduler.should_deghost(idle=not self.is_playing):
+            logging.info(f"Performing deghosting refresh (wear: {self.refresh_scheduler.wear:.0%})")
             self.periodic_refresh()
-            self.last_full_refresh = current_time
             return True
         return False
         
@@ -438,6 +710,7 @@ class EinkDisplayManager:
             self.current_title = ""  # Force a full redraw
             
         logging.info(f"Updating display: {title} - Playing: {is_playing} - Progress: {progress:.1%}")
+        self.is_playing = is_playing
         
         if is_playing:
             # Only update if significant changes
@@ -449,8 +722,9 @@ class EinkDisplayManager:
                 progress_delta > 0.05):
                 
                 if title != self.current_title:
-                    # Full refresh for new title
-                    self.show_playback(title, current_time, total_time, progress)
+                    # Full refresh for new title; the art is set by the player before this
+                    self.show_playback(title, current_time, total_time, progress,
+                                       art=self.playback_screen['art'].state)
                 else:
                     # Partial refresh for progress updates
                     self._update_progress_section(current_time, total_time, progress)
@@ -463,7 +737,8 @@ class EinkDisplayManager:
                 # If we have a title but not playing, show paused state
                 pause_title = f"{title} (Paused)"
                 if pause_title != self.current_title:
-                    self.show_playback(pause_title, current_time, total_time, progress)
+                    self.show_playback(pause_title, current_time, total_time, progress, playing=False,
+                                       art=self.playback_screen['art'].state)
                     self.current_title = pause_title
             else:
                 # No track playing
@@ -522,72 +797,57 @@ class EinkDisplayManager:
             self.normal_font = ImageFont.load_default()
             self.small_font = ImageFont.load_default() 
 
+    def _find_logo_path(self):
+        """Locate the logo file, searching the candidate locations only once"""
+        if self._logo_searched:
+            return self._logo_path
+        self._logo_searched = True
+        
+        # Look for logo in the root directory and multiple possible locations
+        project_root = Path(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
+        possible_paths = [
+            project_root / "logo.png",
+            Path(os.path.dirname(os.path.abspath(__file__))) / "logo.png",
+            Path("/app/logo.png"),  # For Docker environment
+            Path("logo.png"),       # Current working directory
+        ]
+        
+        for path in possible_paths:
+            if path.exists():
+                logging.info(f"Found logo at {path}")
+                self._logo_path = path
+                return path
+        
+        logging.warning(f"Logo file not found in any of these locations: {possible_paths}")
+        return None
+
+    def _render_logo(self, logo_path):
+        """Load the logo and scale it to a 1-bit image of the display size"""
+        logo_img = Image.open(logo_path)
+        logging.info(f"Successfully opened logo image: {logo_img.size} mode={logo_img.mode}")
+        
+        # Resize if necessary to fit display
+        if logo_img.size != (self.width, self.height):
+            logging.info(f"Resizing logo from {logo_img.size} to {(self.width, self.height)}")
+            logo_img = logo_img.resize((self.width, self.height), Image.LANCZOS)
+        
+        # Convert to 1-bit color depth if needed
+        if logo_img.mode != '1':
+            logo_img = logo_img.convert('1')
+        return logo_img
+
     def show_logo(self):
-        """Show the logo image at startup"""
-        logging.info("Attempting to show logo...")
+        """Show the logo image, rendering it only the first time"""
         try:
-            # Look for logo in the root directory and multiple possible locations
-            project_root = Path(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
-            logging.info(f"Project root directory: {project_root}")
-            
-            # Try multiple possible locations with debug output
-            possible_paths = [
-                project_root / "logo.png",
-                Path(os.path.dirname(os.path.abspath(__file__))) / "logo.png",
-                Path("/app/logo.png"),  # For Docker environment
-                Path("logo.png"),       # Current working directory
-            ]
-            
-            # Debug output for all paths
-            for path in possible_paths:
-                logging.info(f"Checking for logo at: {path} (exists: {path.exists()})")
-            
-            logo_path = None
-            for path in possible_paths:
-                if path.exists():
-                    logo_path = path
-                    break
-            
-            if logo_path:
-                logging.info(f"Found logo at {logo_path}")
-                try:
-                    logo_img = Image.open(logo_path)
-                    logging.info(f"Successfully opened logo image: {logo_img.size} mode={logo_img.mode}")
-                    
-                    # Resize if necessary to fit display
-                    if logo_img.size != (self.width, self.height):
-                        logging.info(f"Resizing logo from {logo_img.size} to {(self.width, self.height)}")
-                        logo_img = logo_img.resize((self.width, self.height), Image.LANCZOS)
-                    
-                    # Convert to 1-bit color depth if needed
-                    if logo_img.mode != '1':
-                        logging.info(f"Converting logo from {logo_img.mode} to 1-bit mode")
-                        logo_img = logo_img.convert('1')
-                    
-                    # Clear display first
-                    logging.info("Clearing display before showing logo")
-                    self.clear_display()
-                    
-                    # Replace the current image buffer with the logo
-                    self.image = logo_img
-                    self.draw = ImageDraw.Draw(self.image)
-                    
-                    # Update display with logo
-                    logging.info("Sending logo to display...")
-                    self.update_display(use_partial_update=False)
-                    logging.info("Logo displayed successfully")
-                    
-                    # Return True to indicate success
-                    return True
-                except Exception as e:
-                    logging.error(f"Error processing logo image: {e}")
-                    import traceback
-                    logging.error(traceback.format_exc())
-            else:
-                logging.warning(f"Logo file not found in any of these locations: {possible_paths}")
+            logo_path = self._find_logo_path()
+            if logo_path is None:
                 # Try the debug logo as fallback
-                logging.info("Trying debug logo instead...")
                 return self.draw_debug_logo()
+            
+            frame = self.frame_cache.get('logo', lambda: self._render_logo(logo_path), source=logo_path)
+            self._show_frame(frame)
+            logging.info("Logo displayed successfully")
+            return True
         except Exception as e:
             logging.error(f"Error in show_logo: {e}")
             import traceback
@@ -599,47 +859,41 @@ class EinkDisplayManager:
 
     def draw_debug_logo(self):
         """Draw a simple logo for debugging"""
-        logging.info("Creating debug logo image")
-        self.clear_display()
+        frame = self.frame_cache.get('debug-logo', self._render_debug_logo)
+        self._show_frame(frame)
+        logging.info("Debug logo displayed")
+        return True 
+
+    def _render_debug_logo(self):
+        """Render the debug logo"""
+        image = Image.new('1', (self.width, self.height), 255)
+        draw = ImageDraw.Draw(image)
         
         # Draw a border
-        self.draw.rectangle((0, 0, self.width-1, self.height-1), outline=0, width=3)
+        draw.rectangle((0, 0, self.width-1, self.height-1), outline=0, width=3)
         
         # Draw diagonal lines
-        self.draw.line((0, 0, self.width-1, self.height-1), fill=0, width=2)
-        self.draw.line((0, self.height-1, self.width-1, 0), fill=0, width=2)
+        draw.line((0, 0, self.width-1, self.height-1), fill=0, width=2)
+        draw.line((0, self.height-1, self.width-1, 0), fill=0, width=2)
         
         # Draw text in the center
-        self.draw.text((self.width//2 - 40, self.height//2 - 10), 
-                      "DEBUG LOGO", 
-                      fill=0,
-                      font=self.title_font)
-        
-        # Update the display with full update
-        logging.info("Displaying debug logo...")
-        self.update_display(use_partial_update=False)
-        logging.info("Debug logo displayed")
-        time.sleep(3)
-        return True 
+        draw.text((self.width//2 - 40, self.height//2 - 10), 
+                  "DEBUG LOGO", 
+                  fill=0,
+                  font=self.title_font)
+        return image
 
     def periodic_refresh(self):
-        """Perform a full refresh to prevent image persistence if the same content
-        has been displayed for too long"""
-        logging.info("Performing periodic full refresh to prevent image persistence")
-        
-        # Store the current image
-        current_image = self.image.copy()
-        
-        # Clear to white
-        self.clear_display()
-        self.update_display(use_partial_update=False)
-        
-        # Optional: flash black
-        self.image = Image.new('1', (self.width, self.height), 0)  # All black
-        self.draw = ImageDraw.Draw(self.image)
-        self.update_display(use_partial_update=False)
+        """Perform a full refresh to clear ghosting left by partial refreshes"""
+        logging.info("Performing full refresh to clear ghosting")
+        if self.simulation_mode or self._front_buffer is None:
+            self.refresh_scheduler.reset()
+            return
         
-        # Return to the previous image
-        self.image = current_image
-        self.draw = ImageDraw.Draw(self.image)
-        self.update_display(use_partial_update=False) 
\ No newline at end of file
+        # Flash white then black, then restore what was on screen. The canvases
+        # are untouched; only packed buffers are sent.
+        mode = self.SCREEN_REFRESH['deghost']
+        current = self._front_buffer
+        for fill in (0xFF, 0x00):
+            self._push_buffer(bytes([fill]) * len(current), mode)
+        self._push_buffer(current, mode)
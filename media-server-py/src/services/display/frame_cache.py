@@ -0,0 +1,116 @@
+"""Pre-rendered frame cache for static e-ink screens"""
+import hashlib
+import logging
+from pathlib import Path
+from typing import Callable, Dict, NamedTuple, Optional, Tuple
+
+from PIL import Image
+
+# Bump whenever rendering or packing changes so stale disk frames are ignored
+CACHE_VERSION = 1
+
+
+class Frame(NamedTuple):
+    """A rendered screen: the 1-bit canvas and its panel-ready buffer"""
+    image: Image.Image
+    buffer: Optional[bytes]
+
+
+class FrameCache:
+    """Renders static screens once and keeps them as panel-ready buffers
+
+    Frames are held in memory for the lifetime of the display manager. When a
+    cache directory is given they are also stored on disk, keyed by the source
+    file mtime and panel geometry, so a restart skips rendering as well.
+    """
+
+    def __init__(self, size: Tuple[int, int], pack: Callable[[Image.Image], Optional[bytes]],
+                 cache_dir: Optional[str] = None):
+        self.size = size
+        self._pack = pack
+        self._frames: Dict[str, Tuple[str, Frame]] = {}
+        self._cache_dir = Path(cache_dir) if cache_dir else None
+
+        if self._cache_dir:
+            try:
+                self._cache_dir.mkdir(parents=True, exist_ok=True)
+            except OSError as e:
+                logging.warning(f"Frame cache directory unavailable, using memory only: {e}")
+                self._cache_dir = None
+
+    def get(self, name: str, render: Callable[[], Image.Image], source: Optional[Path] = None) -> Frame:
+        """Return the named frame, rendering it only if no valid copy is cached"""
+        key = self._key(name, source)
+
+        cached = self._frames.get(name)
+        if cached and cached[0] == key:
+            return cached[1]
+
+        frame = self._load(name, key)
+        if frame is None:
+            logging.info(f"Rendering frame '{name}'")
+            image = render()
+            if image.mode != '1':
+                image = image.convert('1')
+            buffer = self._pack(image)
+            frame = Frame(image, bytes(buffer) if buffer is not None else None)
+            self._store(name, key, frame)
+
+        self._frames[name] = (key, frame)
+        return frame
+
+    def invalidate(self, name: Optional[str] = None) -> None:
+        """Drop one frame, or every frame, from the in-memory cache"""
+        if name is None:
+            self._frames.clear()
+        else:
+            self._frames.pop(name, None)
+
+    def _key(self, name: str, source: Optional[Path]) -> str:
+        """Build a cache key from the frame name, source mtime and panel geometry"""
+        mtime = source.stat().st_mtime_ns if source else 0
+        width, height = self.size
+        raw = f"{CACHE_VERSION}:{name}:{source}:{mtime}:{width}x{height}"
+        return hashlib.md5(raw.encode()).hexdigest()
+
+    def _frame_path(self, name: str, key: str) -> Path:
+        return self._cache_dir / f"{name}-{key}.frame"
+
+    def _load(self, name: str, key: str) -> Optional[Frame]:
+        """Load a frame from disk; the file holds the canvas bytes then the packed buffer"""
+        if not self._cache_dir:
+            return None
+
+        path = self._frame_path(name, key)
+        if not path.exists():
+            return None
+
+        try:
+            data = path.read_bytes()
+            width, height = self.size
+            image_size = ((width + 7) // 8) * height
+            image = Image.frombytes('1', self.size, data[:image_size])
+            buffer = data[image_size:] or None
+            if buffer is None:
+                # Written without a panel attached, pack it now
+                packed = self._pack(image)
+                buffer = bytes(packed) if packed is not None else None
+            logging.info(f"Loaded frame '{name}' from {path}")
+            return Frame(image, buffer)
+        except Exception as e:
+            logging.warning(f"Ignoring unreadable cached frame {path}: {e}")
+            return None
+
+    def _store(self, name: str, key: str, frame: Frame) -> None:
+        """Write a frame to disk and remove older versions of it"""
+        if not self._cache_dir:
+            return
+
+        path = self._frame_path(name, key)
+        try:
+            for stale in self._cache_dir.glob(f"{name}-*.frame"):
+                if stale != path:
+                    stale.unlink()
+            path.write_bytes(frame.image.tobytes() + (frame.buffer or b''))
+        except OSError as e:
+            logging.warning(f"Could not write cached frame {path}: {e}")
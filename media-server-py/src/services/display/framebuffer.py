@@ -0,0 +1,29 @@
+"""Helpers for packed framebuffers of the Waveshare 2.13" V4 panel"""
+
+
+def count_changed_pixels(old, new) -> int:
+    """Count the pixels that differ between two packed buffers"""
+    if old is None or len(old) != len(new):
+        return len(new) * 8
+    return (int.from_bytes(old, 'big') ^ int.from_bytes(new, 'big')).bit_count()
+
+
+def panel_window(bbox, panel_height: int):
+    """Panel RAM window covering a bounding box on the landscape canvas
+
+    Returns (x_start, y_start, x_end, y_end) in panel coordinates, widened to
+    whole bytes horizontally because the controller addresses columns in bytes.
+    """
+    left, top, right, bottom = bbox
+    # Canvas pixel (x, y) lands on panel column y, row panel_height - 1 - x
+    return (top // 8 * 8, panel_height - right, (bottom - 1) // 8 * 8 + 7, panel_height - 1 - left)
+
+
+def crop_window(buffer, line_bytes: int, window) -> bytes:
+    """Bytes of a packed buffer inside a panel window, row by row"""
+    x_start, y_start, x_end, y_end = window
+    first, last = x_start // 8, x_end // 8 + 1
+    return b''.join(
+        buffer[row * line_bytes + first:row * line_bytes + last]
+        for row in range(y_start, y_end + 1)
+    )
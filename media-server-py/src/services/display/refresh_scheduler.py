@@ -0,0 +1,54 @@
+"""Ghosting budget for deciding when the e-ink panel needs a deghosting refresh"""
+import logging
+
+
+class RefreshScheduler:
+    """Tracks partial-refresh wear and decides when to deghost
+
+    Ghosting builds up with every partial refresh, roughly in proportion to
+    how many were done and how many pixels they changed. Full and fast
+    refreshes drive every pixel through a complete waveform and clear it.
+    Deghosting is deferred until the display is idle unless the wear grows
+    far past the budget.
+    """
+
+    def __init__(self, panel_pixels: int, max_partials: int = 20,
+                 max_changed_area: float = 3.0, hard_limit: float = 2.0):
+        # Budget: max_partials partial refreshes, or max_changed_area times the
+        # panel area changed by them, whichever comes first
+        self.panel_pixels = panel_pixels
+        self.max_partials = max_partials
+        self.max_changed_area = max_changed_area
+        # Wear level at which we deghost even while playing
+        self.hard_limit = hard_limit
+
+        self.partial_count = 0
+        self.changed_pixels = 0
+
+    def record_refresh(self, partial: bool, changed_pixels: int) -> None:
+        """Account for a refresh that was just sent to the panel"""
+        if partial:
+            self.partial_count += 1
+            self.changed_pixels += changed_pixels
+        else:
+            self.reset()
+
+    def reset(self) -> None:
+        """Clear the accumulated wear after a full-waveform refresh"""
+        self.partial_count = 0
+        self.changed_pixels = 0
+
+    @property
+    def wear(self) -> float:
+        """Accumulated wear as a fraction of the budget, 1.0 means due"""
+        by_count = self.partial_count / self.max_partials
+        by_area = self.changed_pixels / (self.max_changed_area * self.panel_pixels)
+        return max(by_count, by_area)
+
+    def should_deghost(self, idle: bool) -> bool:
+        """Whether to deghost now; only over the hard limit while not idle"""
+        wear = self.wear
+        if wear >= self.hard_limit:
+            logging.info(f"Ghosting budget exceeded ({wear:.0%}), deghosting now")
+            return True
+        return idle and wear >= 1.0
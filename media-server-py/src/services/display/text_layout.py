@@ -0,0 +1,60 @@
+"""Memoized text measurement and truncation for the e-ink display"""
+from collections import OrderedDict
+
+from PIL import Image, ImageDraw
+
+
+class TextLayout:
+    """Measures and truncates text, remembering recent results
+
+    Results are keyed by text, font and width in a bounded LRU, so redrawing
+    the same title or duration costs a dictionary lookup. Truncation binary
+    searches the prefix length, taking O(log n) layout calls instead of one
+    per character.
+    """
+
+    ELLIPSIS = "..."
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._cache = OrderedDict()
+        # Measure on a 1-bit surface so results match drawing on the canvas
+        self._draw = ImageDraw.Draw(Image.new('1', (1, 1)))
+
+    def _remember(self, key, value):
+        self._cache[key] = value
+        if len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+        return value
+
+    def measure(self, text: str, font) -> float:
+        """Width of text in pixels when drawn with font"""
+        key = ('measure', text, font)
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            return self._cache[key]
+        return self._remember(key, self._draw.textlength(text, font=font))
+
+    def truncate(self, text: str, font, max_width: float) -> str:
+        """Longest prefix of text, plus an ellipsis, that fits within max_width"""
+        if not text:
+            return ""
+
+        key = ('truncate', text, font, max_width)
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            return self._cache[key]
+
+        if self._draw.textlength(text, font=font) <= max_width:
+            return self._remember(key, text)
+
+        # Largest prefix length whose truncated form still fits
+        low, high = 0, len(text)
+        while low < high:
+            mid = (low + high + 1) // 2
+            if self._draw.textlength(text[:mid] + self.ELLIPSIS, font=font) <= max_width:
+                low = mid
+            else:
+                high = mid - 1
+
+        return self._remember(key, text[:low] + self.ELLIPSIS)
@@ -0,0 +1,137 @@
+"""Retained-mode widgets for composing e-ink screens"""
+from typing import Dict, List, Tuple
+
+from PIL import ImageChops
+
+Bounds = Tuple[int, int, int, int]
+
+# Marks a widget that has never been drawn on the current canvas
+_UNRENDERED = object()
+
+
+class Widget:
+    """A fixed region of the screen that redraws itself when its state changes"""
+
+    def __init__(self, bounds: Bounds):
+        self.bounds = bounds
+        self.state = None
+        self._rendered = _UNRENDERED
+
+    @property
+    def invalid(self) -> bool:
+        return self._rendered is _UNRENDERED or self.state != self._rendered
+
+    def invalidate(self) -> None:
+        """Force a redraw, e.g. after something else drew over the canvas"""
+        self._rendered = _UNRENDERED
+
+    def render(self, draw) -> None:
+        """Clear the widget's bounds and draw its current state"""
+        draw.rectangle(self.bounds, fill=255)
+        self.paint(draw, self.state)
+        self._rendered = self.state
+
+    def paint(self, draw, state) -> None:
+        raise NotImplementedError
+
+
+class TextWidget(Widget):
+    """Single line of text, truncated to fit its bounds"""
+
+    def __init__(self, bounds: Bounds, font, layout, align: str = 'left'):
+        super().__init__(bounds)
+        self.font = font
+        self.layout = layout
+        self.align = align
+
+    def paint(self, draw, text) -> None:
+        if not text:
+            return
+        left, top, right, _ = self.bounds
+        text = self.layout.truncate(text, self.font, right - left)
+        x = left
+        if self.align == 'right':
+            x = right - self.layout.measure(text, self.font)
+        draw.text((x, top), text, font=self.font, fill=0)
+
+
+class ProgressBarWidget(Widget):
+    """Outlined bar whose state is the filled width in pixels"""
+
+    @property
+    def resolution(self) -> int:
+        """Number of distinct fill steps the bar can show"""
+        left, _, right, _ = self.bounds
+        return right - left
+
+    def fill_for(self, progress: float) -> int:
+        """Filled width for a progress fraction"""
+        # Progress is quantised to whole pixels so sub-pixel changes are free
+        return int(max(0.0, min(progress, 1.0)) * self.resolution)
+
+    def set_progress(self, progress: float) -> None:
+        self.state = self.fill_for(progress)
+
+    def paint(self, draw, fill_width) -> None:
+        left, top, right, bottom = self.bounds
+        draw.rectangle(self.bounds, outline=0)
+        if fill_width:
+            draw.rectangle((left, top, left + fill_width, bottom), fill=0)
+
+
+class StatusIconWidget(Widget):
+    """Play triangle or pause bars"""
+
+    def paint(self, draw, playing) -> None:
+        if playing is None:
+            return
+        left, top, right, bottom = self.bounds
+        if playing:
+            draw.polygon([(left, top), (right, (top + bottom) // 2), (left, bottom)], fill=0)
+        else:
+            bar = (right - left + 1) // 3
+            draw.rectangle((left, top, left + bar - 1, bottom), fill=0)
+            draw.rectangle((right - bar + 1, top, right, bottom), fill=0)
+
+
+class ImageWidget(Widget):
+    """1-bit image, such as album art, pasted at the top left of its bounds"""
+
+    def paint(self, draw, image) -> None:
+        if image is None:
+            return
+        left, top, _, _ = self.bounds
+        # The bounds are already white, so only the black pixels are drawn
+        draw.bitmap((left, top), ImageChops.invert(image), fill=0)
+
+
+class Compositor:
+    """A screen made of named widgets that tracks which of them changed
+
+    render() redraws only invalidated widgets and returns their bounds, the
+    dirty regions the refresh layer has to send.
+    """
+
+    def __init__(self, widgets: Dict[str, Widget]):
+        self.widgets = widgets
+
+    def __getitem__(self, name: str) -> Widget:
+        return self.widgets[name]
+
+    def update(self, **states) -> None:
+        """Set the state of several widgets by name"""
+        for name, state in states.items():
+            self.widgets[name].state = state
+
+    def invalidate_all(self) -> None:
+        for widget in self.widgets.values():
+            widget.invalidate()
+
+    def render(self, draw) -> List[Bounds]:
+        """Redraw invalidated widgets and return the dirty regions"""
+        dirty = []
+        for widget in self.widgets.values():
+            if widget.invalid:
+                widget.render(draw)
+                dirty.append(widget.bounds)
+        return dirty
@@ -2,6 +2,7 @@ from typing import Protocol, Optional
 from abc import abstractmethod
 import asyncio
 from services.audio.ytdlp_audio_player import YtDlpAudioPlayer
+from services.audio.negative_cache import UnplayableError
 
 class AudioPlayer(Protocol):
     """Protocol defining the interface for audio players"""
@@ -16,6 +17,21 @@ class AudioPlayer(Protocol):
         """Stop current playback"""
         pass
     
+    @abstractmethod
+    def prefetch(self, url: str) -> None:
+        """Start preparing a URL that is likely to be played next"""
+        pass
+    
+    @abstractmethod
+    async def toggle_pause(self) -> None:
+        """Pause or resume current playback"""
+        pass
+    
+    @abstractmethod
+    def set_status_publisher(self, publish: callable) -> None:
+        """Publish status through publish(topic, payload, retain=...)"""
+        pass
+    
     @abstractmethod
     def get_status(self) -> dict:
         """Get current playback status"""
@@ -29,6 +45,8 @@ class AudioPlayer(Protocol):
 class MediaPlayer:
     def __init__(self, audio_player: Optional[AudioPlayer] = None):
         self.audio_player = audio_player or YtDlpAudioPlayer()
+        # The play_audio() call still loading, superseded by the next one
+        self._play_task: Optional[asyncio.Task] = None
         
         # Set up event listeners
         self.audio_player.on('error', self._handle_error)
@@ -42,14 +60,25 @@ class MediaPlayer:
     
     async def play_audio(self, url: str) -> None:
         print(f"Playing audio from URL: {url}")
+        # Latest request wins: cancel one that is still resolving or downloading
+        if self._play_task and not self._play_task.done():
+            print("Cancelling previous request")
+            self._play_task.cancel()
+        self._play_task = asyncio.current_task()
         try:
-            # Ensure any existing playback is stopped first
-            await self.stop_audio()
+            # play() stops the current track itself, without flashing the standby screen
             await self.audio_player.play(url)
+        except UnplayableError as error:
+            # Already stopped, and the error screen has to stay up
+            print(f"Can't play audio: {error}")
+            raise
         except Exception as error:
             print(f"Error playing audio: {error}")
             await self.stop_audio()  # Ensure cleanup on error
             raise
+        finally:
+            if self._play_task is asyncio.current_task():
+                self._play_task = None
     
     async def stop_audio(self) -> None:
         try:
@@ -57,6 +86,29 @@ class MediaPlayer:
         except Exception as error:
             print(f"Error stopping audio: {error}")
     
+    def prefetch(self, url: str) -> None:
+        """Speculatively prepare a URL; play_audio() reuses the work if it matches"""
+        try:
+            self.audio_player.prefetch(url)
+        except Exception as error:
+            print(f"Error prefetching audio: {error}")
+    
+    async def toggle_pause(self) -> None:
+        try:
+            await self.audio_player.toggle_pause()
+        except Exception as error:
+            print(f"Error toggling pause: {error}")
+    
+    def set_status_publisher(self, publish: callable) -> None:
+        self.audio_player.set_status_publisher(publish)
+    
     def get_playback_status(self) -> dict:
         """Get current playback status"""
-        return self.audio_player.get_status() 
\ No newline at end of file
+        return self.audio_player.get_status()
+    
+    def now_playing(self) -> Optional[str]:
+        """URL of the track that is playing or paused, if any"""
+        status = self.get_playback_status()
+        if status.get('is_playing') or status.get('paused'):
+            return status.get('source_url')
+        return None 
\ No newline at end of file
@@ -1,36 +1,95 @@
 import asyncio
-from typing import Dict, Callable, List, Optional, Any
-import json
-from aiomqtt import Client, MqttError
+import random
+import time
+from typing import Dict, Callable, List, Optional, Any, Set, Tuple
+from functools import partial
+from aiomqtt import Client, MqttError, Will
 from config.config import config
+from handlers.url_handler import classify_url
+from .topic_queue import TopicQueue
+from .tag_registry import TagRegistry
+
+class _ZoneState:
+    """What one zone's reader sent last, for filtering its taps"""
+    def __init__(self):
+        self.last_url: Optional[str] = None
+        self.last_url_time = 0.0
+        self.last_uid: Optional[str] = None
+        self.last_uid_time = 0.0
+        self.now_playing: Optional[Callable[[], Optional[str]]] = None
 
 class MQTTService:
     def __init__(self):
         self._client: Optional[Client] = None
-        self._event_handlers: Dict[str, List[Callable]] = {
-            'url': []
+        # (zone, handler) pairs per event; a handler for zone None hears every zone
+        self._event_handlers: Dict[str, List[Tuple[Optional[str], Callable]]] = {
+            'url': [],
+            'toggle_pause': [],
+            'tag_detected': []
         }
         self._running = False
+        # Tasks started without awaiting them, kept referenced until they finish
+        self._tasks: Set[asyncio.Task] = set()
         self._topic_handlers = {}
+        # One queue and worker task per topic, so handlers never hold up the receive loop
+        self._queues: Dict[str, TopicQueue] = {}
         
-        # Add display manager
-        try:
-            from ..display.eink_manager import EinkDisplayManager
-            self.display_manager = EinkDisplayManager()
-        except Exception as e:
-            print(f"Failed to initialize display manager in MQTT service: {e}")
+        # Zones share the connection; topics are routed by the zone in them
+        self._zoned = any(zone.name for zone in config.zones)
+        self._zones: Dict[Optional[str], _ZoneState] = {zone.name: _ZoneState() for zone in config.zones}
         
-    def on(self, event: str, callback: Callable[[str], Any]) -> None:
-        """Register an event handler"""
+        # Duplicate tap filtering, counted across zones
+        self.url_counters = {
+            'received': 0,
+            'debounced': 0,
+            'already_loading': 0,
+            'same_url_ignored': 0,
+            'same_url_toggled': 0,
+            'speculated': 0,
+        }
+        
+        # Connection health
+        self.connection_stats = {
+            'connects': 0,
+            'reconnects': 0,
+            'downtime_seconds': 0.0,
+        }
+        self._disconnected_at: Optional[float] = None
+        self._connected = asyncio.Event()
+        
+        # Outbound messages, the latest per topic, sent over the shared connection
+        self._outbound: Dict[str, Tuple[str, int, bool]] = {}
+        self._outbound_ready = asyncio.Event()
+        self._last_publish: Dict[str, float] = {}
+        self.publish_stats = {
+            'queued': 0,
+            'coalesced': 0,
+            'sent': 0,
+        }
+        # Published by the broker if the connection drops without a disconnect
+        self._will: Optional[Will] = None
+        
+        # Tag UIDs arrive before the URL they carry, which is looked up here
+        # Tags are physical objects carried between rooms, so zones share the registry
+        self._tag_registry = TagRegistry(config.mqtt.tag_registry_file)
+        
+    def on(self, event: str, callback: Callable[[str], Any], zone: Optional[str] = None) -> None:
+        """Register an event handler, for one zone's events or with zone None for all"""
         if event in self._event_handlers:
-            self._event_handlers[event].append(callback)
+            self._event_handlers[event].append((zone, callback))
+    
+    def set_now_playing(self, provider: Callable[[], Optional[str]], zone: Optional[str] = None) -> None:
+        """Register a function returning the URL that is playing, for same-tag handling"""
+        self._zones[zone].now_playing = provider
     
-    async def _emit(self, event: str, *args) -> None:
-        """Emit an event to all registered handlers"""
-        print(f"Emitting event: {event}")
+    async def _emit(self, event: str, *args, zone: Optional[str] = None) -> None:
+        """Emit an event of a zone to its registered handlers"""
+        print(f"Emitting event: {event}" + (f" in zone {zone}" if zone else ""))
         if event in self._event_handlers:
-            print(f"Event handlers for {event}: {self._event_handlers[event]}")
-            for handler in self._event_handlers[event]:
+            handlers = [handler for handler_zone, handler in self._event_handlers[event]
+                        if handler_zone is None or handler_zone == zone]
+            print(f"Event handlers for {event}: {handlers}")
+            for handler in handlers:
                 print(f"Calling handler: {handler}")
                 if asyncio.iscoroutinefunction(handler):
                     print(f"Handler is a coroutine, awaiting it...")
@@ -39,6 +98,10 @@ class MQTTService:
                     print(f"Handler is not a coroutine, calling it directly...")
                     handler(*args)
 
+    def set_will(self, topic: str, payload: str) -> None:
+        """Have the broker publish payload, retained, if we vanish; call before start()"""
+        self._will = Will(topic, payload, qos=1, retain=True)
+
     async def start(self) -> None:
         """Start the MQTT service"""
         try:
@@ -46,12 +109,17 @@ class MQTTService:
             self._client = Client(
                 hostname=config.mqtt.host,
                 port=config.mqtt.port,
+                identifier=config.mqtt.client_id,
+                clean_session=config.mqtt.clean_session,
+                will=self._will,
                 keepalive=60  # Add keepalive to prevent connection drops
             )
             
             self._running = True
+            self._start_queues()
             print(f"Creating message loop task for {config.mqtt.host}:{config.mqtt.port}")
-            asyncio.create_task(self._message_loop())
+            self._spawn(self._message_loop())
+            self._spawn(self._publish_loop())
             
             print(f"MQTT client started and listening on port {config.mqtt.port}")
             
@@ -62,38 +130,101 @@ class MQTTService:
             print(f"Traceback: {traceback.format_exc()}")
             raise
 
+    def _spawn(self, coro) -> asyncio.Task:
+        """Run coro in the background, reporting its failure instead of losing it"""
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._task_done)
+        return task
+
+    def _task_done(self, task: asyncio.Task) -> None:
+        self._tasks.discard(task)
+        if not task.cancelled() and task.exception():
+            print(f"Error in background task {task.get_coro().__qualname__}: {task.exception()}")
+
+    def _start_queues(self) -> None:
+        """Set up topic handlers and start a worker queue for each topic of each zone
+        
+        Queue settings are looked up by the plain topic, so every zone gets its
+        own queue with the same policy.
+        """
+        self._topic_handlers = {
+            config.mqtt.url_topic: self._handle_url_message,
+            config.mqtt.tag_uid_topic: self._handle_tag_uid_message,
+        }
+        for zone in self._zones:
+            for base, handler in self._topic_handlers.items():
+                topic = config.mqtt.zone_topic(zone, base)
+                if topic not in self._queues:
+                    policy, maxsize = config.mqtt.topic_queues.get(base, config.mqtt.default_topic_queue)
+                    cancel_running = base in config.mqtt.cancel_running_topics
+                    self._queues[topic] = TopicQueue(topic, partial(handler, zone=zone),
+                                                     policy, maxsize, cancel_running)
+                self._queues[topic].start()
+
+    def _route(self, topic: str) -> Tuple[Optional[str], str]:
+        """Zone and plain topic of an incoming topic"""
+        if self._zoned:
+            parts = topic.split('/', 2)
+            if len(parts) == 3 and parts[0] == config.mqtt.zone_topic_prefix:
+                return parts[1], parts[2]
+        return None, topic
+
+    def _reconnect_delay(self, attempt: int) -> float:
+        """Exponential backoff with full jitter, so a flapping broker isn't hit in lockstep"""
+        ceiling = min(config.mqtt.reconnect_max_delay, config.mqtt.reconnect_min_delay * 2 ** attempt)
+        return random.uniform(config.mqtt.reconnect_min_delay, max(ceiling, config.mqtt.reconnect_min_delay))
+
+    def _on_connected(self) -> None:
+        self._connected.set()
+        stats = self.connection_stats
+        stats['connects'] += 1
+        if self._disconnected_at is not None:
+            downtime = time.monotonic() - self._disconnected_at
+            stats['reconnects'] += 1
+            stats['downtime_seconds'] += downtime
+            self._disconnected_at = None
+            print(f"Reconnected after {downtime:.2f}s (reconnect #{stats['reconnects']}, "
+                  f"{stats['downtime_seconds']:.1f}s down in total)")
+
+    async def _wait_to_reconnect(self, attempt: int) -> None:
+        self._connected.clear()
+        if self._disconnected_at is None:
+            self._disconnected_at = time.monotonic()
+        delay = self._reconnect_delay(attempt)
+        print(f"Attempting to reconnect in {delay:.2f} seconds...")
+        await asyncio.sleep(delay)
+
     async def _message_loop(self) -> None:
         """Handle incoming MQTT messages"""
+        attempt = 0
         while self._running:  # Outer loop for reconnection attempts
             try:
                 print("Attempting to establish MQTT connection...")
                 async with self._client as client:
-                    # Set up topic handlers
-                    self._topic_handlers = {
-                        config.mqtt.url_topic: self._handle_url_message,
-                    }
-                    
-                    # Add audio state topic handler
-                    self._topic_handlers[config.mqtt.audio_state_topic] = self.on_audio_state_message
-                    
+                    self._on_connected()
+                    attempt = 0
                     # Subscribe to topics
-                    for topic in self._topic_handlers.keys():
-                        print(f"Subscribing to topic: {topic}")
-                        await client.subscribe(topic)
+                    for base in self._topic_handlers.keys():
+                        # One wildcard subscription covers every zone
+                        topic = config.mqtt.zone_topic('+' if self._zoned else None, base)
+                        qos = config.mqtt.topic_qos.get(base, 0)
+                        print(f"Subscribing to topic: {topic} (QoS {qos})")
+                        await client.subscribe(topic, qos=qos)
                         print(f"Successfully subscribed to {topic}")
                     
                     print("Starting message loop...")
                     while self._running:
                         async for message in client.messages:
                             print(f"Raw message received: Topic={message.topic}, Payload={message.payload}")
-                            await self._handle_message(message)
+                            self._handle_message(message)
 
             except MqttError as error:
                 print(f"MQTT Error: {str(error)}")
                 print(f"Error type: {type(error)}")
                 if self._running:
-                    print("Attempting to reconnect in 5 seconds...")
-                    await asyncio.sleep(5)  # Wait before retry
+                    await self._wait_to_reconnect(attempt)
+                    attempt += 1
                     continue
             except Exception as error:
                 print(f"Unexpected error in message loop: {str(error)}")
@@ -101,58 +232,172 @@ class MQTTService:
                 import traceback
                 print(f"Traceback: {traceback.format_exc()}")
                 if self._running:
-                    print("Attempting to reconnect in 5 seconds...")
-                    await asyncio.sleep(5)
+                    await self._wait_to_reconnect(attempt)
+                    attempt += 1
                     continue
 
-    async def _handle_message(self, message) -> None:
-        """Process incoming MQTT message"""
+    def publish(self, topic: str, payload: str, qos: int = 0, retain: bool = False) -> None:
+        """Queue a message for the shared connection without waiting for it
+        
+        Only the latest payload per topic is kept, and each topic is sent at
+        most once per publish_interval, so frequent state updates are cheap.
+        """
+        if topic in self._outbound:
+            self.publish_stats['coalesced'] += 1
+        self.publish_stats['queued'] += 1
+        self._outbound[topic] = (payload, qos, retain)
+        self._outbound_ready.set()
+
+    async def _publish_loop(self) -> None:
+        """Send queued messages while connected, respecting the per-topic rate limit"""
+        while self._running:
+            await self._outbound_ready.wait()
+            await self._connected.wait()
+            
+            now = time.monotonic()
+            next_due = None
+            for topic in list(self._outbound):
+                due = self._last_publish.get(topic, 0) + config.mqtt.publish_interval
+                if due > now:
+                    next_due = due if next_due is None else min(next_due, due)
+                    continue
+                payload, qos, retain = self._outbound.pop(topic)
+                try:
+                    await self._client.publish(topic, payload, qos=qos, retain=retain)
+                except MqttError as error:
+                    print(f"Error publishing to {topic}: {error}")
+                    # Keep it for after the reconnect, unless something newer was queued
+                    self._outbound.setdefault(topic, (payload, qos, retain))
+                    self._connected.clear()
+                    break
+                self._last_publish[topic] = now
+                self.publish_stats['sent'] += 1
+            
+            if not self._outbound:
+                self._outbound_ready.clear()
+            elif next_due is not None:
+                await asyncio.sleep(next_due - now)
+
+    async def _flush_outbound(self, timeout: float = 2.0) -> None:
+        """Send everything still queued at once, e.g. the idle status before exiting
+        
+        QoS 1, so the broker has it before the connection goes.
+        """
+        if not self._client or not self._connected.is_set():
+            return
+        try:
+            async with asyncio.timeout(timeout):
+                while self._outbound:
+                    topic, (payload, qos, retain) = self._outbound.popitem()
+                    await self._client.publish(topic, payload, qos=max(qos, 1), retain=retain)
+                    self.publish_stats['sent'] += 1
+        except (MqttError, TimeoutError) as error:
+            print(f"Error flushing outbound messages: {error}")
+
+    def _handle_message(self, message) -> None:
+        """Hand an incoming MQTT message to its topic's queue without waiting for it"""
         try:
             topic = message.topic.value
             payload = message.payload.decode()
             
             print(f"Received message on topic {topic}")
             
-            # Dispatch to appropriate handler
-            if topic in self._topic_handlers:
-                await self._topic_handlers[topic](payload)
-            else:
+            # Only configured zones have queues
+            queue = self._queues.get(topic)
+            if queue is None:
                 print(f"No handler for topic: {topic}")
+                return
+            
+            zone, base = self._route(topic)
+            if base == config.mqtt.url_topic:
+                # Every way of writing a link becomes one URL, for the filters and the cache
+                payload = classify_url(payload.strip()).canonical_url or payload.strip()
+                if not self._accept_url(payload, zone):
+                    return
+            elif base == config.mqtt.tag_uid_topic:
+                # Noted here, not in the worker, so the URL that follows can't overtake it
+                payload = payload.strip().lower()
+                state = self._zones[zone]
+                state.last_uid = payload
+                state.last_uid_time = time.monotonic()
+            
+            # Dispatch to the topic's worker
+            queue.put(payload)
                 
         except Exception as error:
             print(f"Error processing published message: {error}")
 
-    async def _handle_url_message(self, payload: str) -> None:
+    def _accept_url(self, url: str, zone: Optional[str] = None) -> bool:
+        """Filter repeated reads of the same tag before they reach the queue
+        
+        This runs before queueing, so a duplicate can't cancel the load it
+        duplicates.
+        """
+        counters = self.url_counters
+        counters['received'] += 1
+        state = self._zones[zone]
+        now = time.monotonic()
+        if state.last_uid and now - state.last_uid_time < config.mqtt.tag_uid_window_seconds:
+            self._tag_registry.learn(state.last_uid, url)
+            # One UID, one URL: a later URL in the window is not from this tag
+            state.last_uid = None
+        repeat = url == state.last_url and now - state.last_url_time < config.mqtt.url_debounce_seconds
+        # The window slides, a tag resting on the reader stays one tap
+        state.last_url = url
+        state.last_url_time = now
+        
+        if repeat:
+            counters['debounced'] += 1
+            print(f"Debounced repeated URL ({counters['debounced']} so far)")
+            return False
+        
+        queue = self._queues.get(config.mqtt.zone_topic(zone, config.mqtt.url_topic))
+        if queue is not None and url in queue:
+            counters['already_loading'] += 1
+            print("URL is already loading, ignoring")
+            return False
+        
+        if state.now_playing and state.now_playing() == url:
+            policy = config.mqtt.same_url_policy
+            if policy == 'toggle-pause':
+                counters['same_url_toggled'] += 1
+                self._spawn(self._emit('toggle_pause', zone=zone))
+                return False
+            if policy != 'restart':
+                counters['same_url_ignored'] += 1
+                print("URL is already playing, ignoring")
+                return False
+        return True
+
+    async def _handle_tag_uid_message(self, payload: str, zone: Optional[str] = None) -> None:
+        """Start loading a known tag's URL speculatively, before the URL itself arrives"""
+        uid = payload
+        url = self._tag_registry.lookup(uid)
+        if url is None:
+            print(f"Unknown tag {uid}, waiting for its URL")
+            return
+        now_playing = self._zones[zone].now_playing
+        queue = self._queues.get(config.mqtt.zone_topic(zone, config.mqtt.url_topic))
+        if (queue is not None and url in queue) or (now_playing and now_playing() == url):
+            # The URL will be filtered as a repeat, nothing to prepare
+            return
+        self.url_counters['speculated'] += 1
+        print(f"Tag {uid} detected, preparing {url}")
+        await self._emit('tag_detected', url, zone=zone)
+
+    async def _handle_url_message(self, payload: str, zone: Optional[str] = None) -> None:
         """Handle URL messages"""
         print(f"Processing URL: {payload}")
-        await self._emit('url', payload)
-
-    async def on_audio_state_message(self, payload: str) -> None:
-        """Handle audio state messages"""
-        try:
-            # Parse the JSON payload
-            data = json.loads(payload)
-            
-            # Extract needed fields with defaults
-            title = data.get('title', '')
-            is_playing = data.get('is_playing', False)
-            current_time = data.get('current_time', '0:00')
-            total_time = data.get('total_time', '0:00')
-            progress = data.get('progress', 0.0)
-            
-            # Update the display if available
-            if hasattr(self, 'display_manager'):
-                self.display_manager.update_display_with_audio_info(
-                    title, is_playing, current_time, total_time, progress
-                )
-        except Exception as e:
-            print(f"Error handling audio state message: {e}")
+        await self._emit('url', payload, zone=zone)
 
     async def stop(self) -> None:
         """Stop the MQTT service"""
         try:
+            await self._flush_outbound()
             self._running = False
             self._client = None
+            for queue in self._queues.values():
+                await queue.stop()
             print("MQTT client stopped")
         except Exception as error:
             print(f"Error stopping MQTT client: {error}")
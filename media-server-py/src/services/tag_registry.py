@@ -0,0 +1,47 @@
+import json
+from pathlib import Path
+from typing import Dict, Optional
+
+class TagRegistry:
+    """Remembers which URL each NFC tag UID carries
+
+    Mappings are learned whenever a UID is followed by a URL, and kept in a
+    JSON file so they survive restarts.
+    """
+
+    def __init__(self, path: str):
+        self._path = Path(path)
+        self._urls: Dict[str, str] = {}
+        self._load()
+
+    def _load(self) -> None:
+        if not self._path.exists():
+            return
+        try:
+            with open(self._path, 'r') as f:
+                self._urls = json.load(f)
+        except Exception as e:
+            print(f"Error loading tag registry: {e}")
+
+    def _save(self) -> None:
+        try:
+            self._path.parent.mkdir(parents=True, exist_ok=True)
+            partial_file = self._path.with_suffix('.part')
+            with open(partial_file, 'w') as f:
+                json.dump(self._urls, f)
+            partial_file.replace(self._path)
+        except Exception as e:
+            print(f"Error saving tag registry: {e}")
+
+    def lookup(self, uid: str) -> Optional[str]:
+        """URL last seen on the tag, if known"""
+        return self._urls.get(uid)
+
+    def learn(self, uid: str, url: str) -> None:
+        """Record the URL a tag carries, writing the file only when it changed"""
+        if self._urls.get(uid) != url:
+            self._urls[uid] = url
+            self._save()
+
+    def __len__(self) -> int:
+        return len(self._urls)
@@ -0,0 +1,107 @@
+import asyncio
+from collections import deque
+from typing import Any, Awaitable, Callable, Optional
+
+# Overflow policies for a full topic queue
+FIFO = 'fifo'                # keep order, drop the new message
+DROP_OLDEST = 'drop-oldest'  # drop the oldest waiting message
+LATEST_WINS = 'latest-wins'  # only the newest message waits, whatever the size
+
+POLICIES = (FIFO, DROP_OLDEST, LATEST_WINS)
+
+class TopicQueue:
+    """Bounded queue of payloads for one topic, drained by its own worker task
+
+    put() never blocks, so the MQTT receive loop can hand messages over and go
+    straight back to reading. The handler runs for one payload at a time.
+    With cancel_running, a new message also cancels the handler still working
+    on an older one.
+    """
+
+    def __init__(self, topic: str, handler: Callable[[str], Awaitable[Any]],
+                 policy: str = FIFO, maxsize: int = 16, cancel_running: bool = False):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown queue policy for {topic}: {policy}")
+        self.topic = topic
+        self.handler = handler
+        self.policy = policy
+        self.maxsize = max(1, maxsize)
+        self.cancel_running = cancel_running
+        self.dropped = 0
+        self.cancelled = 0
+        self._pending = deque()
+        self._ready = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._running: Optional[asyncio.Task] = None
+        self._running_payload: Optional[str] = None
+
+    def start(self) -> None:
+        """Start the worker task"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the worker, abandoning waiting payloads"""
+        self._pending.clear()
+        if self._running:
+            self._running.cancel()
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def put(self, payload: str) -> None:
+        """Queue a payload, applying the overflow policy if the queue is full"""
+        if self.policy == LATEST_WINS:
+            self.dropped += len(self._pending)
+            self._pending.clear()
+        elif len(self._pending) >= self.maxsize:
+            self.dropped += 1
+            if self.policy == FIFO:
+                print(f"Queue for {self.topic} full, dropping new message")
+                return
+            self._pending.popleft()
+            print(f"Queue for {self.topic} full, dropped oldest message")
+        self._pending.append(payload)
+        if self.cancel_running and self._running and not self._running.done():
+            # The newer message supersedes the one being handled
+            self.cancelled += 1
+            self._running.cancel()
+        self._ready.set()
+
+    @property
+    def current(self) -> Optional[str]:
+        """Payload whose handler is running, if any"""
+        return self._running_payload
+
+    def __contains__(self, payload: str) -> bool:
+        """Whether payload is waiting or being handled"""
+        return payload == self._running_payload or payload in self._pending
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def __bool__(self) -> bool:
+        # Without this an empty queue would be falsy, and `if queue and ...`
+        # would skip checks while a handler is still running
+        return True
+
+    async def _run(self) -> None:
+        while True:
+            await self._ready.wait()
+            while self._pending:
+                payload = self._pending.popleft()
+                # The handler runs as its own task so a newer message can cancel it
+                self._running = asyncio.create_task(self.handler(payload))
+                self._running_payload = payload
+                await asyncio.wait({self._running})
+                if self._running.cancelled():
+                    print(f"Handling of {self.topic} message superseded: {payload}")
+                elif self._running.exception():
+                    print(f"Error handling message on {self.topic}: {self._running.exception()}")
+                self._running = None
+                self._running_payload = None
+            self._ready.clear()
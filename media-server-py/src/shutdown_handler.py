@@ -20,21 +20,49 @@ from services.display.eink_manager import EinkDisplayManager
 class ShutdownManager:
     def __init__(self):
         self.display_manager = None
+        self._before_exit = None
+        self._shutdown_task = None
         
-    def setup(self):
-        """Set up the shutdown handler"""
+    def setup(self, display_manager=None, before_exit=None):
+        """Set up the shutdown handler
+        
+        Pass the display manager already driving the panel, so shutdown knows
+        its state, e.g. that it is in deep sleep. before_exit is a coroutine
+        function run first, e.g. to tell MQTT subscribers we stopped playing;
+        it needs setup() to be called from the running event loop.
+        """
         logging.info("Setting up shutdown handler")
         
         # Initialize display manager with refresh_task=False to avoid asyncio error
-        self.display_manager = EinkDisplayManager(start_refresh_task=False)
+        self.display_manager = display_manager or EinkDisplayManager(start_refresh_task=False)
+        self._before_exit = before_exit
         
         # Register signal handlers
-        signal.signal(signal.SIGTERM, self.handle_shutdown)
-        signal.signal(signal.SIGINT, self.handle_shutdown)
+        if before_exit:
+            # Handled inside the loop, so before_exit can still use the network
+            loop = asyncio.get_running_loop()
+            for signum in (signal.SIGTERM, signal.SIGINT):
+                loop.add_signal_handler(signum, self._schedule_shutdown, signum)
+        else:
+            signal.signal(signal.SIGTERM, self.handle_shutdown)
+            signal.signal(signal.SIGINT, self.handle_shutdown)
         
         logging.info("Shutdown handler configured")
         logging.info("==== SHUTDOWN HANDLER SETUP COMPLETE ====")
         
+    def _schedule_shutdown(self, signum):
+        if self._shutdown_task is None:
+            self._shutdown_task = asyncio.create_task(self._shutdown(signum))
+
+    async def _shutdown(self, signum):
+        try:
+            # Docker gives 10 seconds by default, most of which the display needs
+            await asyncio.wait_for(self._before_exit(), timeout=3)
+        except Exception as e:
+            logging.error(f"Error before shutdown: {e}")
+        # Exits from a plain callback, so this task finishes cleanly first
+        asyncio.get_running_loop().call_soon(self.handle_shutdown, signum, None)
+        
     def handle_shutdown(self, signum, frame):
         """Handle shutdown signal by displaying logo and then exiting"""
         logging.info(f"Received signal {signum}, preparing for shutdown")
@@ -45,13 +73,12 @@ class ShutdownManager:
                 logging.info("Displaying logo before shutdown")
                 self.display_manager.show_logo()
                 
-                # Increase time for display to update - Docker gives 10 seconds by default
-                logging.info("Waiting for display to update...")
-                time.sleep(3)
-                
-                # Cleanup display
+                # Cleanup display; the panel work runs on the display worker
                 logging.info("Cleaning up display")
-                self.display_manager.cleanup()
+                done = self.display_manager.cleanup()
+                if done:
+                    # Docker gives 10 seconds by default
+                    done.result(timeout=8)
                 logging.info("Display cleanup complete")
             except Exception as e:
                 logging.error(f"Error during shutdown display: {e}")
@@ -0,0 +1,11 @@
+import os
+import sys
+
+# The display modules pick the simulator at import time
+os.environ['WAVESHARE_SIMULATOR'] = '1'
+os.environ.pop('EPD_SIM_REALTIME', None)
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for path in (os.path.join(root, 'src'), os.path.join(root, 'lib')):
+    if path not in sys.path:
+        sys.path.insert(0, path)
@@ -0,0 +1,68 @@
+"""Display regression tests: drive EinkDisplayManager on the EPD simulator"""
+import pytest
+from PIL import ImageChops
+
+from display_benchmark import run_session
+from services.display.eink_manager import EinkDisplayManager
+
+
+@pytest.fixture
+def display():
+    display = EinkDisplayManager(start_refresh_task=False)
+    yield display
+    display._worker.shutdown(wait=True)
+
+
+def refreshes_since(epd, before):
+    return {mode: count - before[mode] for mode, count in epd.stats['refreshes'].items()}
+
+
+def assert_panel_shows_front(display):
+    """What the simulated panel shows has to match the front canvas exactly"""
+    display._wait_panel()
+    snapshot = display.epd.snapshot()
+    assert snapshot.size == display._front.size
+    assert ImageChops.logical_xor(snapshot.convert('1'), display._front).getbbox() is None
+
+
+def test_playback_session_refreshes(display):
+    epd = display.epd
+    before = dict(epd.stats['refreshes'])
+
+    run_session(display, ticks=40)
+    display._wait_panel()
+
+    # Loading uses the fast waveform, every progress tick a partial, standby a full refresh
+    assert refreshes_since(epd, before) == {'full': 1, 'fast': 1, 'partial': 41}
+    assert epd.stats['stale_base_partials'] == 0
+    assert_panel_shows_front(display)
+
+
+def test_panel_matches_canvas_after_each_screen(display):
+    display.show_loading("Downloading...")
+    assert_panel_shows_front(display)
+
+    display.show_playback("A Track", "0:00", "3:20", 0)
+    assert_panel_shows_front(display)
+
+    for tick in range(1, 6):
+        display._update_progress_section(f"0:{tick * 10:02d}", "3:20", tick / 20)
+        assert_panel_shows_front(display)
+
+    display.show_playback("A Track", "0:50", "3:20", 0.25, playing=False)
+    assert_panel_shows_front(display)
+
+    display.show_standby()
+    assert_panel_shows_front(display)
+    assert display.epd.stats['stale_base_partials'] == 0
+
+
+def test_unchanged_progress_sends_nothing(display):
+    display.show_playback("A Track", "0:00", "3:20", 0)
+    display._wait_panel()
+    before = dict(display.epd.stats['refreshes'])
+
+    display._update_progress_section("0:00", "3:20", 0)
+    display._wait_panel()
+
+    assert refreshes_since(display.epd, before) == {'full': 0, 'fast': 0, 'partial': 0}